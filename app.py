@@ -17,6 +17,9 @@ from prefs import Prefs
 utils.mem('app8')
 from utils import Cycle
 
+# While waiting for the display to change, check for input this often.
+POLL_INTERVAL = 0.02
+
 
 class App:
     def __init__(self, fs, network, frame, button_map, dial_map):
@@ -38,6 +41,7 @@ class App:
         self.lang = self.langs.current()
         self.brightness_reader = DialReader(
             'BRIGHTNESS', dial_map['BRIGHTNESS'], 3/32.0, 0.01, 0.99)
+        self.woken = False
         utils.mem('App.__init__ done')
 
     def start(self):
@@ -50,7 +54,26 @@ class App:
         self.brightness_reader.step(self.receive)
         self.mode.step()
 
+    def idle(self):
+        """Waits until the current mode has something new to display,
+        polling for input every POLL_INTERVAL seconds in the meantime.
+        Returns early as soon as any input is received."""
+        self.woken = False
+        wake_time = self.mode.get_wake_time()
+        while not self.woken:
+            delay = wake_time - cctime.monotonic()
+            if delay <= 0:
+                break
+            self.frame.pause(min(delay, POLL_INTERVAL))
+            self.brightness_reader.step(self.receive)
+            self.mode.poll()
+
+    def wake(self):
+        """Ends the current idle() so that the next step() runs now."""
+        self.woken = True
+
     def receive(self, command, arg=None):
+        self.wake()
         print('[' + command + ('' if arg is None else ': ' + str(arg)) + ']')
         if command == 'BRIGHTNESS':
             delta, value = arg
@@ -107,3 +130,4 @@ def run(fs, network, frame, button_map, dial_map):
     app.start()
     while True:
         app.step()
+        app.idle()
@@ -24,6 +24,18 @@ def sorted_longest_first(labels):
     return sorted(labels, key=lambda label: -len(label))
 
 
+def to_bigint(f, scale):
+    """Multiplies a float by an integer scale, exactly, as a bigint."""
+    mantissa, exponent = math.frexp(f)
+    # CircuitPython floats have 22 bits of mantissa
+    scaled = int(mantissa * (1<<22)) * scale
+    if exponent > 0:
+        scaled = scaled * (1<<exponent)
+    else:
+        scaled = scaled // (1<<-exponent)
+    return scaled // (1<<22)
+
+
 utils.mem('ccapi4')
 
 
@@ -85,11 +97,14 @@ class Module(SlotRepr):
 
 
 class Timer(Module):
-    __slots__ = ("ref_datetime",)
+    __slots__ = "ref_datetime", "anniversary", "countdown"
 
     def load(self, data):
         Module.load(self, data)
         self.ref_datetime = try_isoformat_to_datetime(data, "timestamp")
+        # Filled in and kept up to date by ccui.calc_deadline().
+        self.anniversary = None
+        self.countdown = None
         return self
 
 
@@ -119,7 +134,11 @@ class NewsfeedItem(SlotRepr):
 
 
 class Value(Module):
-    __slots__ = "initial", "ref_datetime", "growth", "rate", "resolution", "unit_labels"
+    __slots__ = (
+        "initial", "ref_datetime", "growth", "rate", "resolution", "unit_labels",
+        "decimals", "scale", "fixed_scale", "fixed_decimals",
+        "scaled_initial", "scaled_rate", "ref_millis"
+    )
 
     def load(self, data):
         Module.load(self, data)
@@ -136,6 +155,16 @@ class Value(Module):
             res, decimals, scale = res * 10, decimals + 1, scale * 10
         self.decimals = decimals  # number of decimal places
         self.scale = scale  # scaling factor as a bigint
+
+        # Precompute the integers needed to evaluate the value at any time:
+        # the initial value and the rate per second, both scaled by
+        # fixed_scale, and the reference time in milliseconds since 1970.
+        self.fixed_scale = scale * 10000000  # 22 bits = about 7 decimal places
+        self.fixed_decimals = decimals + 7
+        self.scaled_initial = to_bigint(self.initial, self.fixed_scale)
+        self.scaled_rate = to_bigint(self.rate, self.fixed_scale)
+        self.ref_millis = self.ref_datetime and cctime.datetime_to_millis(
+            self.ref_datetime)
         return self
 
 
@@ -0,0 +1,143 @@
+"""Loads fonts in CCF, a compact bitmap font format compiled from BDF.
+
+A CCF file has three parts, all little-endian:
+
+  - A header: the magic bytes b'CCF1', then the font's ascent, descent,
+    and bounding box (width, height, x offset, y offset) as signed 16-bit
+    integers, then the number of glyphs as an unsigned 16-bit integer.
+
+  - An index with one entry per glyph, sorted by code point: the code
+    point and the offset of the glyph's record from the start of the file,
+    both as unsigned 32-bit integers.
+
+  - The glyph records.  Each record has the glyph's width, height, x and y
+    offsets, and advance width (one byte each; the offsets are signed),
+    followed by the bitmap, 1 bit per pixel, row by row, with the most
+    significant bit on the left and each row padded to a whole byte.
+
+Opening a font reads only the header and the index.  Glyphs are read from
+the file and decoded the first time they are asked for, just like the PCF
+loader in adafruit_bitmap_font, so a Font can be used in its place.  Unlike
+the PCF loader, a Font can limit how many decoded glyphs it keeps, evicting
+the least recently used ones.  tools/compile_font produces CCF files.
+"""
+
+from fontio import Glyph
+import struct
+
+MAGIC = b'CCF1'
+HEADER = '<4shhhhhhH'
+INDEX_ENTRY = '<II'
+GLYPH_HEADER = '<BBbbB'
+INDEX_ENTRY_SIZE = struct.calcsize(INDEX_ENTRY)
+GLYPH_HEADER_SIZE = struct.calcsize(GLYPH_HEADER)
+
+
+class Font:
+    def __init__(self, file, bitmap_class, max_glyphs=None, release=None):
+        """Opens a CCF font file.  At most max_glyphs decoded glyphs (or any
+        number, if it is None) are kept; if release is given, release(glyph)
+        is called for each glyph that is evicted."""
+        self.file = file
+        self.bitmap_class = bitmap_class
+        self.max_glyphs = max_glyphs
+        self.release = release
+        magic, ascent, descent, w, h, x, y, count = struct.unpack(
+            HEADER, file.read(struct.calcsize(HEADER)))
+        if magic != MAGIC:
+            raise ValueError('Not a CCF font file')
+        self.ascent = ascent
+        self.descent = descent
+        self.bounding_box = (w, h, x, y)
+        self.count = count
+        self.index = file.read(count * INDEX_ENTRY_SIZE)
+        self.buffer = bytearray(GLYPH_HEADER_SIZE)
+        # Maps code points to [glyph, last_used]; glyph is None for code
+        # points that the font doesn't have.
+        self.glyphs = {}
+        self.clock = 0  # incremented on every lookup, for LRU ordering
+        self.evictions = 0
+
+    def get_bounding_box(self):
+        return self.bounding_box
+
+    def find(self, code_point):
+        """Returns the file offset of the glyph for the given code point,
+        or None if the font has no such glyph."""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            cp, offset = struct.unpack_from(
+                INDEX_ENTRY, self.index, mid * INDEX_ENTRY_SIZE)
+            if cp == code_point:
+                return offset
+            if cp < code_point:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def get_glyph(self, code_point):
+        """Returns a fontio.Glyph for the given code point, or None if the
+        font has no glyph for it."""
+        self.clock += 1
+        entry = self.glyphs.get(code_point)
+        if not entry:
+            self.load_glyphs((code_point,))
+            entry = self.glyphs[code_point]
+        entry[1] = self.clock
+        return entry[0]
+
+    def load_glyphs(self, code_points):
+        """Reads and decodes the glyphs for the given code points (a string
+        or an iterable of integers), in file order."""
+        if isinstance(code_points, int):
+            code_points = (code_points,)
+        elif isinstance(code_points, str):
+            code_points = [ord(c) for c in code_points]
+        pending = []
+        for code_point in code_points:
+            if code_point not in self.glyphs:
+                offset = self.find(code_point)
+                if offset is None:
+                    self.add(code_point, None)
+                else:
+                    pending.append((offset, code_point))
+        for offset, code_point in sorted(pending):
+            self.clock += 1
+            self.add(code_point, self.read_glyph(offset))
+
+    def add(self, code_point, glyph):
+        if self.max_glyphs is not None:
+            while self.glyphs and len(self.glyphs) >= self.max_glyphs:
+                self.evict()
+        self.glyphs[code_point] = [glyph, self.clock]
+
+    def evict(self):
+        """Removes the least recently used glyph."""
+        glyphs = self.glyphs
+        code_point = min(glyphs, key=lambda code_point: glyphs[code_point][1])
+        glyph, last_used = glyphs.pop(code_point)
+        self.evictions += 1
+        if glyph and self.release:
+            self.release(glyph)
+
+    def read_glyph(self, offset):
+        file = self.file
+        file.seek(offset)
+        file.readinto(self.buffer)
+        w, h, dx, dy, shift_x = struct.unpack(GLYPH_HEADER, self.buffer)
+        stride = (w + 7) // 8
+        size = stride * h
+        data = memoryview(bytearray(size))
+        if size:
+            file.readinto(data)
+        bitmap = self.bitmap_class(w, h, 2)
+        i = 0
+        for y in range(h):
+            row = data[y * stride:(y + 1) * stride]
+            for x in range(w):
+                if row[x >> 3] & (0x80 >> (x & 7)):
+                    bitmap[i + x] = 1
+            i += w
+        return Glyph(bitmap, 0, w, h, dx, dy, shift_x, 0)
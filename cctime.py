@@ -15,6 +15,7 @@ except:
 EPOCH = datetime.datetime(1970, 1, 1)
 fake_time = None
 time_source = None
+frame_millis = None
 
 
 def monotonic():
@@ -71,6 +72,43 @@ def get_datetime():
         return datetime.datetime.fromtimestamp(get_time())
 
 
+def get_millis():
+    """Returns the current time in integer milliseconds since 1970-01-01
+    00:00:00 UTC."""
+    return int(get_time() * 1000)
+
+
+def start_frame():
+    """Reads the clock once for the frame about to be drawn, and returns the
+    time in milliseconds.  Until the next call, get_frame_millis() returns
+    this same time, so everything drawn in a frame shows the same moment."""
+    global frame_millis
+    frame_millis = get_millis()
+    return frame_millis
+
+
+def get_frame_millis():
+    """Returns the time read by the last start_frame(), or the current time
+    if no frame has been started."""
+    if frame_millis is None:
+        return get_millis()
+    return frame_millis
+
+
+def millis_to_datetime(t):
+    """Converts integer milliseconds since 1970-01-01 00:00:00 UTC to a
+    datetime in UTC."""
+    return EPOCH + datetime.timedelta(
+        seconds=t // 1000, microseconds=t % 1000 * 1000)
+
+
+def datetime_to_millis(dt):
+    """Converts a datetime in UTC to integer milliseconds since 1970-01-01
+    00:00:00 UTC, without going through floating-point seconds."""
+    delta = dt - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000 + delta.microseconds // 1000
+
+
 def set_fake_time(t):
     """Sets the time for testing.  To use the real time, set_fake_time(None)."""
     global fake_time
@@ -120,4 +158,31 @@ class FrameTimer:
         self.next = wait_until(self.next) + self.interval
 
 
+class Animation:
+    """A timebase for scrolling and other motion, so that things move at
+    the same speed no matter how often frames are drawn.  The position
+    increases at a constant rate (in units per second) from the time of the
+    last reset().  If more than max_gap seconds pass between calls to
+    get_position(), the animation is paused for the extra time instead of
+    jumping ahead, e.g. while another mode is on the display."""
+
+    def __init__(self, rate, max_gap=1):
+        self.rate = rate
+        self.max_gap = max_gap
+        self.reset()
+
+    def reset(self, position=0):
+        """Restarts the animation from the given position."""
+        self.origin = position
+        self.start = self.last = monotonic()
+
+    def get_position(self):
+        """Returns the current position as a float."""
+        now = monotonic()
+        if now - self.last > self.max_gap:
+            self.start += now - self.last
+        self.last = now
+        return self.origin + self.rate * (now - self.start)
+
+
 utils.mem('cctime6')
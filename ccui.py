@@ -1,62 +1,91 @@
 """Functions for formatting and constructing the Climate Clock display."""
 
 import cctime
-import math
-try:
-    import datetime
-except:
-    import adafruit_datetime as datetime
+from compositor import Layer
 
 
 TEST_MODE = False
 
 
-def calc_deadline(module, now):
+def get_anniversary(module, now):
+    """Returns (start, end, years) for the year of a timer module's countdown
+    that contains the given time (in milliseconds since 1970): the times of
+    the deadline's anniversaries before and at or after now, in
+    milliseconds, and the number of whole years from the later anniversary
+    to the deadline."""
     deadline = module.ref_datetime
-    next_anniversary = deadline.replace(year=now.year)
-    if next_anniversary < now:
-        next_anniversary = deadline.replace(year=now.year + 1)
-    y = deadline.year - next_anniversary.year
-    t = int((next_anniversary - now).total_seconds())
-    s, t = t % 60, t // 60
-    m, t = t % 60, t // 60
-    h, d = t % 24, t // 24
-    return y, d, h, m, s
-
-
-def to_bigint(f, scale):
-    mantissa, exponent = math.frexp(f)
-    # CircuitPython floats have 22 bits of mantissa
-    scaled = int(mantissa * (1<<22)) * scale
-    if exponent > 0:
-        scaled = scaled * (1<<exponent)
+    now_datetime = cctime.millis_to_datetime(now)
+    next_anniversary = deadline.replace(year=now_datetime.year)
+    if next_anniversary < now_datetime:
+        next_anniversary = deadline.replace(year=now_datetime.year + 1)
+    last_anniversary = deadline.replace(year=next_anniversary.year - 1)
+    return (
+        cctime.datetime_to_millis(last_anniversary),
+        cctime.datetime_to_millis(next_anniversary),
+        deadline.year - next_anniversary.year
+    )
+
+
+def calc_deadline(module, now):
+    """Returns the years, days, hours, minutes, and seconds left before a
+    timer module's deadline, at a time in milliseconds since 1970.  The
+    surrounding anniversaries of the deadline are worked out only when now
+    leaves the current year of the countdown; otherwise this is integer
+    arithmetic, done at most once per second."""
+    anniversary = module.anniversary
+    if not (anniversary and anniversary[0] < now <= anniversary[1]):
+        anniversary = module.anniversary = get_anniversary(module, now)
+    start, end, y = anniversary
+    t = (end - now) // 1000
+    key = (end, t)
+    if not (module.countdown and module.countdown[0] == key):
+        s, t = t % 60, t // 60
+        m, t = t % 60, t // 60
+        h, d = t % 24, t // 24
+        module.countdown = key, (y, d, h, m, s)
+    return module.countdown[1]
+
+
+def get_scaled_value(module, now_millis):
+    """Returns the value of a linear value module at a time given in
+    milliseconds since 1970, as an integer scaled by module.fixed_scale."""
+    elapsed_ms = now_millis - module.ref_millis
+    return module.scaled_initial + module.scaled_rate * elapsed_ms // 1000
+
+
+def format_scaled_value(module, scaled_value):
+    """Formats a value from get_scaled_value() for display."""
+    decimals = module.fixed_decimals
+    str_value = str(scaled_value)
+    if len(str_value) > decimals:
+        whole_part = str_value[:-decimals]
     else:
-        scaled = scaled // (1<<-exponent)
-    return scaled // (1<<22)
+        whole_part = '0'
+        str_value = str(scaled_value + module.fixed_scale)
+    fractional_part = str_value[-decimals:-7]
+    return whole_part + '.' + fractional_part
 
 
-def format_value(module, now):
-    elapsed_ms = int((now - module.ref_datetime).total_seconds() * 1000)
+def format_value(module, now_millis):
+    """Formats the value of a value module at a time given in milliseconds
+    since 1970 (see cctime.get_frame_millis())."""
     if module.growth == 'linear':
-        scale = module.scale * 10000000  # 22 bits = about 7 decimal places
-        decimals = module.decimals + 7
-
-        scaled_initial = to_bigint(module.initial, scale)
-        scaled_rate = to_bigint(module.rate, scale)
-        scaled_value = scaled_initial + scaled_rate * elapsed_ms // 1000
-        str_value = str(scaled_value)
-        if len(str_value) > decimals:
-            whole_part = str_value[:-decimals]
-        else:
-            whole_part = '0'
-            str_value = str(scaled_value + scale)
-        fractional_part = str_value[-decimals:-7]
-        return whole_part + '.' + fractional_part
+        return format_scaled_value(
+            module, get_scaled_value(module, now_millis))
     return ''
 
 
-def render_deadline_module(frame, y, module, cv, lang='en', upper=False):
-    yr, d, h, m, s = calc_deadline(module, cctime.get_datetime())
+def get_value_interval(module):
+    """Returns the number of seconds between changes in the last displayed
+    digit of a value module, or None if the value never changes."""
+    if module.growth == 'linear' and module.rate:
+        return 1 / (module.scale * abs(module.rate))
+
+
+def format_deadline(module, now, lang='en', upper=False):
+    """Formats the countdown for a timer module at a time given in
+    milliseconds since 1970."""
+    yr, d, h, m, s = calc_deadline(module, now)
     if TEST_MODE:
         # Just testing various languages for now.
         texts = {
@@ -68,10 +97,62 @@ def render_deadline_module(frame, y, module, cv, lang='en', upper=False):
         }
         text = texts.get(lang, texts['en'])
     else:
-        text = "HELLO GREG" #Hello World test gtest
-#        text = f'{yr} years {d} days {h:02d}:{m:02d}:{s:02d}'    if upper:
+        text = f'{yr} years {d} days {h:02d}:{m:02d}:{s:02d}'
+    if upper:
         text = text.upper()
-    frame.paste(1, y, frame.new_label(text, 'kairon-16'), cv=cv)
+    return text
+
+
+class DeadlineRenderer:
+    """Draws the deadline countdown.  The whole text is laid out and drawn
+    only when its shape changes (e.g. when the day count loses a digit, or
+    the language changes); otherwise, only the character cells that differ
+    from the previous frame are repainted, which is usually just one or two
+    digits per second."""
+
+    FONT = 'kairon-16'
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Forces a full redraw on the next call to render().  Call this
+        whenever something else has drawn over the deadline."""
+        self.text = None
+        self.cells = None
+        self.width = 0
+        self.target = None
+
+    def render(self, frame, y, module, cv, lang='en', upper=False):
+        """Draws the countdown if it has changed, and returns True if
+        anything was drawn."""
+        text = format_deadline(module, cctime.get_frame_millis(), lang, upper)
+        target = (frame, y, cv)
+        if text == self.text and target == self.target:
+            return False
+
+        font = frame.fontlib.get(self.FONT)
+        h = font.ascent + font.descent
+        cells = frame.fontlib.get_cells(text, self.FONT)
+        if target == self.target and cells == self.cells:
+            for i in range(len(text)):
+                if text[i] != self.text[i]:
+                    x = 1 + cells[i]
+                    frame.clear(x, y, cells[i + 1] - cells[i], h)
+                    glyph = font.get_glyph(ord(text[i]))
+                    if glyph:
+                        # A one-character label starts at the left edge of
+                        # its glyph, so shift it to where it sits in the text.
+                        frame.draw_text(x + glyph.dx, y, text[i], self.FONT, cv)
+        else:
+            w = frame.draw_text(1, y, text, self.FONT, cv)
+            if target == self.target and self.width > w:
+                frame.clear(1 + w, y, self.width - w, h)
+            self.width = w
+        self.text = text
+        self.cells = cells
+        self.target = target
+        return True
 
 
 def render_lifeline_module(frame, y, module, cv, lang='en', upper=False):
@@ -81,11 +162,36 @@ def render_lifeline_module(frame, y, module, cv, lang='en', upper=False):
         render_newsfeed_module(frame, y, module, cv, lang, upper)
 
 
-def render_value_module(frame, y, module, cv, lang='en', upper=False):
+def get_value_layouts(module, fontlib, width):
+    """Lists the ways to label a value module in a band of the given width,
+    in order of preference: each text label, longest first, with each unit
+    label in turn.  Each entry is (text, unit_text, max_w), where max_w is
+    the widest that the value and its unit label can be for the text label
+    to fit beside them."""
+    layouts = []
+    for text in module.labels:
+        max_w = width - 1 - fontlib.measure(text, 'kairon-10')
+        for unit_text in module.unit_labels:
+            layouts.append((text, unit_text, max_w))
+    return layouts
+
+
+def choose_value_layout(fontlib, value_text, layouts):
+    """Returns the (text, unit_text) pair of the first layout that fits the
+    given value, or of the last layout if none of them fit."""
+    for text, unit_text, max_w in layouts:
+        if fontlib.measure(value_text + unit_text, 'kairon-16') <= max_w:
+            break
+    return text, unit_text
+
+
+def render_value_module(
+        frame, y, module, cv, lang='en', upper=False, layout=None):
+    """Draws a value module.  layout is the (text, unit_text) pair to show;
+    if it is None, the best pair that fits in the frame is chosen."""
     if TEST_MODE:
         value_text = '43.5'
         unit_text = 'M km²'
-        value_label = frame.new_label(value_text + unit_text, 'kairon-16')
         # Just testing various languages for now.
         texts = {
           'de': 'geshütztes indigenes Land',
@@ -97,58 +203,247 @@ def render_value_module(frame, y, module, cv, lang='en', upper=False):
         text = texts.get(lang, texts['en'])
         if upper:
             text = text.upper()
-        text_label = frame.new_label(text, 'kairon-10')
     else:
-        value_text = format_value(module, cctime.get_datetime())
-        for text in module.labels:
-            text_label = frame.new_label(text, 'kairon-10')
-            for unit_text in module.unit_labels:
-                value_label = frame.new_label(value_text + unit_text, 'kairon-16')
-                if value_label.w + text_label.w < frame.w:
-                    break
-            if value_label.w + text_label.w < frame.w:
-                break
+        value_text = format_value(module, cctime.get_frame_millis())
+        if not layout:
+            layout = choose_value_layout(frame.fontlib, value_text,
+                get_value_layouts(module, frame.fontlib, frame.w))
+        text, unit_text = layout
+    # The value changes on most frames, so draw it without a label, but the
+    # text beside it stays the same, so paste it from a label that the frame
+    # can keep.
     x = 1
-    frame.paste(x, y, value_label, cv=cv)
-    x += value_label.w
-    frame.paste(x + 4, y + 5, text_label, cv=cv)
+    x += frame.draw_text(x, y, value_text + unit_text, 'kairon-16', cv)
+    label = frame.new_label(text, 'kairon-10')
+    frame.paste(x + 4, y + 5, label, cv=cv)
+    text_w = label.w
+    value_font = frame.fontlib.get('kairon-16')
+    text_font = frame.fontlib.get('kairon-10')
+    return x + 4 + text_w - 1, max(
+        value_font.ascent + value_font.descent,
+        5 + text_font.ascent + text_font.descent)
+
+
+class NewsfeedTicker:
+    """Scrolls the headlines of a newsfeed module from right to left as one
+    continuous line of text, at a speed that doesn't depend on the frame
+    rate (frames that come late just scroll further).  Instead of rendering
+    a label for a whole headline, the ticker keeps only the characters that
+    are currently visible, plus one character of lookahead past the right
+    edge, and draws them with draw_text() on each frame.  As characters
+    scroll off the left edge they are dropped, and the next characters of
+    the feed are appended on the right, so memory use is bounded by the
+    width of the display.  The ticker spans the width of the frame it is
+    drawn into."""
+
+    FONT = 'kairon-16'
+    SPEED = 120  # pixels per second
+
+    def __init__(self):
+        self.width = 0
+        self.reset()
+
+    def reset(self):
+        """Starts the feed again from its first item at the right edge."""
+        self.module = None
+        self.animation = cctime.Animation(self.SPEED)
+        self.position = 0  # total number of pixels scrolled
+        self.item_index = 0
+        self.item_text = ''
+        self.char_index = 0
+        self.chars = []  # characters in the visible window
+        self.advances = []  # advance width of each character in the window
+        self.x = self.width  # pen position of the first character
+        self.end = self.width  # pen position after the last character
+
+    def next_char(self):
+        """Returns the next character of the feed, cycling through items."""
+        while self.char_index >= len(self.item_text):
+            items = self.module.items
+            if self.item_text:
+                self.item_index = (self.item_index + 1) % len(items)
+            item = items[self.item_index]
+            self.item_text = f'{item.headline} ({item.source}) \xb7 '
+            self.char_index = 0
+        char = self.item_text[self.char_index]
+        self.char_index += 1
+        return char
+
+    def scroll(self, font, dx):
+        """Moves the window dx pixels to the left, dropping characters that
+        have gone past the left edge and adding characters on the right."""
+        self.x -= dx
+        self.end -= dx
+        while self.chars and self.x + self.advances[0] <= 0:
+            self.x += self.advances.pop(0)
+            self.chars.pop(0)
+        # Stop once the last character starts at or past the right edge.
+        while not self.chars or self.end - self.advances[-1] < self.width:
+            char = self.next_char()
+            glyph = font.get_glyph(ord(char))
+            advance = glyph.shift_x if glyph else 0
+            self.chars.append(char)
+            self.advances.append(advance)
+            self.end += advance
 
+    def render(self, frame, y, module, cv):
+        if module is not self.module or frame.w != self.width:
+            self.width = frame.w
+            self.reset()
+            self.module = module
+        if not module.items:
+            return
+        font = frame.fontlib.get(self.FONT)
+        position = int(self.animation.get_position())
+        self.scroll(font, position - self.position)
+        self.position = position
+
+        # A label starts at the left edge of its first glyph, so shift it to
+        # where the first character's pen position is.
+        glyph = font.get_glyph(ord(self.chars[0]))
+        left = self.x + (glyph.dx if glyph else 0)
+        frame.draw_text(left, y, ''.join(self.chars), self.FONT, cv)
+        if left > 0:
+            frame.clear(0, y, left, font.ascent + font.descent)
+
+
+newsfeed_ticker = NewsfeedTicker()
 
-DISPLAY_WIDTH = 192
-newsfeed_x = DISPLAY_WIDTH
-newsfeed_index = 0
-headline_label = None
-headline_width = None
 
 def render_newsfeed_module(frame, y, module, cv, lang='en', upper=False):
-    global newsfeed_x
-    global newsfeed_index
-    global headline_label
-    global headline_width
-
-    i = newsfeed_index
-    n = len(module.items)
-
-    if not headline_label:
-        item = module.items[i]
-        text = f'{item.headline} ({item.source}) \xb7 '
-        headline_width = frame.new_label(text, 'kairon-16').w
-
-        text_with_trail = text
-        for attempt in range(3):
-            i = (i + 1) % n
-            item = module.items[i]
-            trail = f'{item.headline} ({item.source}) \xb7 '
-            text_with_trail += trail
-            headline_label = frame.new_label(text_with_trail, 'kairon-16')
-            if headline_label.w >= headline_width + DISPLAY_WIDTH:
-                break
-
-    frame.paste(newsfeed_x, y, headline_label, cv=cv)
-
-    if newsfeed_x + headline_width < 0:
-        newsfeed_x += headline_width
-        newsfeed_index = (i + 1) % n
-        headline_label = None
-    else:
-        newsfeed_x -= 4
+    newsfeed_ticker.render(frame, y, module, cv)
+
+
+def get_charsets(defn, now):
+    """Returns a dictionary that maps each font ID to a string of all the
+    characters that the modules of a clock definition may be drawn with,
+    for preloading with FontLibrary.preload()."""
+    charsets = {'kairon-10': set(), 'kairon-16': set('+-.0123456789')}
+    for module in defn.modules:
+        if module.type == 'timer':
+            text = format_deadline(module, now)
+            charsets[DeadlineRenderer.FONT].update(text + text.upper())
+        if module.type == 'value':
+            for label in module.labels:
+                charsets['kairon-10'].update(label)
+            for label in module.unit_labels:
+                charsets['kairon-16'].update(label)
+        if module.type == 'newsfeed':
+            for item in module.items:
+                charsets[NewsfeedTicker.FONT].update(
+                    f'{item.headline} ({item.source}) \xb7 ')
+    return {
+        font_id: ''.join(sorted(chars)) for font_id, chars in charsets.items()
+    }
+
+
+class ModuleLayer(Layer):
+    """A compositor layer that shows a module in a band across the display,
+    h pixels high and starting at y.  The module is drawn into a view of
+    the band, so it is clipped to the band.  The mode sets the module and
+    how to show it."""
+
+    def __init__(self, y, h=16):
+        super().__init__()
+        self.y = y
+        self.h = h
+        self.band = None  # view of the band in the frame last drawn into
+        self.module = None
+        self.cv = None
+        self.lang = 'en'
+        self.upper = False
+
+    def set_module(self, module, cv, lang='en', upper=False):
+        if (module, cv, lang, upper) != (
+                self.module, self.cv, self.lang, self.upper):
+            self.module = module
+            self.cv = cv
+            self.lang = lang
+            self.upper = upper
+            self.invalidate()
+
+    def get_band(self, frame):
+        if not self.band or self.band.parent is not frame:
+            self.band = frame.view(0, self.y, frame.w, self.h)
+        return self.band
+
+
+class DeadlineLayer(ModuleLayer):
+    """Shows the deadline countdown, repainting only the digits that change."""
+
+    incremental = True
+
+    def __init__(self, y, h=16):
+        super().__init__(y, h)
+        self.renderer = DeadlineRenderer()
+
+    def reset(self):
+        super().reset()
+        self.renderer.reset()
+
+    def is_dirty(self):
+        return True  # the renderer works out whether anything has changed
+
+    def draw(self, frame):
+        band = self.get_band(frame)
+        if self.renderer.render(
+                band, 0, self.module, self.cv, self.lang, self.upper):
+            return 1, self.y, self.renderer.width, band.h
+
+
+class ValueLayer(ModuleLayer):
+    """Shows a value module, redrawn when its displayed value changes.  The
+    mode can give the layer a table of layouts for each module, made by
+    get_value_layouts(); the layout to use is chosen again only when the
+    value's length or first character changes, as the digits all have the
+    same advance width in these fonts."""
+
+    def __init__(self, y, h=16):
+        super().__init__(y, h)
+        self.text = None
+        self.layouts = {}  # maps each module to its list of layouts
+        self.layout_key = None
+        self.layout = None
+
+    def set_layouts(self, layouts):
+        self.layouts = layouts
+        self.layout_key = None
+        self.invalidate()
+
+    def get_layout(self, frame):
+        key = (self.module, frame.w, len(self.text), self.text[:1])
+        if key != self.layout_key:
+            layouts = self.layouts.get(self.module)
+            if layouts is None:
+                layouts = get_value_layouts(self.module, frame.fontlib, frame.w)
+            self.layout = choose_value_layout(frame.fontlib, self.text, layouts)
+            self.layout_key = key
+        return self.layout
+
+    def is_dirty(self):
+        text = format_value(self.module, cctime.get_frame_millis())
+        if text != self.text:
+            self.text = text
+            self.dirty = True
+        return self.dirty
+
+    def draw(self, frame):
+        band = self.get_band(frame)
+        w, h = render_value_module(band, 0, self.module, self.cv,
+            self.lang, self.upper, self.get_layout(band))
+        return 1, self.y, w, min(h, band.h)
+
+
+class NewsfeedLayer(ModuleLayer):
+    """Shows a newsfeed module as a ticker that scrolls on every frame."""
+
+    incremental = True
+
+    def is_dirty(self):
+        return True
+
+    def draw(self, frame):
+        band = self.get_band(frame)
+        render_newsfeed_module(
+            band, 0, self.module, self.cv, self.lang, self.upper)
+        return 0, self.y, band.w, band.h
@@ -2,6 +2,7 @@ import ccapi
 from ccinput import ButtonReader, Press
 import cctime
 import ccui
+from compositor import Compositor, TextLayer
 from mode import Mode
 from updater import SoftwareUpdater
 import utils
@@ -17,6 +18,17 @@ class ClockMode(Mode):
         self.updater = SoftwareUpdater(fs, network, app.prefs, self)
         self.deadline = None
         self.lifeline = None
+        self.second = None  # the second of wall-clock time last displayed
+
+        self.loading_layer = TextLayer(
+            1, 0, 'Loading...', 'kairon-10', self.frame.pack(255, 255, 255),
+            static=True)
+        self.deadline_layer = ccui.DeadlineLayer(0)
+        self.lifeline_layers = {
+            'value': ccui.ValueLayer(16),
+            'newsfeed': ccui.NewsfeedLayer(16)
+        }
+        self.compositor = Compositor()
 
         self.reload_definition()
 
@@ -47,12 +59,19 @@ class ClockMode(Mode):
                 display = defn.config.display
                 self.deadline_cv = self.frame.pack(*display.deadline.primary)
                 self.lifeline_cv = self.frame.pack(*display.lifeline.primary)
+            self.frame.fontlib.preload(
+                ccui.get_charsets(defn, cctime.get_millis()))
+            fontlib, w = self.frame.fontlib, self.frame.w
+            self.lifeline_layers['value'].set_layouts(dict(
+                (m, ccui.get_value_layouts(m, fontlib, w))
+                for m in defn.modules if m.type == 'value'))
         except Exception as e:
             utils.report_error(e, 'Could not load API file')
+        self.clear()
 
     def start(self):
         self.reader.reset()
-        self.frame.clear()
+        self.clear()
         sec = self.app.prefs.get('auto_cycling_sec')
         self.next_advance = sec and cctime.monotonic() + sec
 
@@ -62,27 +81,59 @@ class ClockMode(Mode):
             if sec:
                 self.next_advance += sec
             self.lifeline = self.lifelines.next()
-            self.frame.clear()
+            self.clear()
 
-        if not self.deadline:
-            label = self.frame.new_label('Loading...', 'kairon-10')
-            self.frame.paste(1, 0, label, cv=self.frame.pack(255, 255, 255))
-        if self.deadline:
-            ccui.render_deadline_module(
-                self.frame, 0, self.deadline,
-                self.deadline_cv, self.app.lang, self.force_caps)
-        if self.lifeline:
-            ccui.render_lifeline_module(
-                self.frame, 16, self.lifeline,
-                self.lifeline_cv, self.app.lang, self.force_caps)
+        lang, upper = self.app.lang, self.force_caps
+        self.deadline_layer.set_module(
+            self.deadline, self.deadline_cv, lang, upper)
+        for layer in self.lifeline_layers.values():
+            layer.set_module(self.lifeline, self.lifeline_cv, lang, upper)
+        self.second = cctime.start_frame() // 1000
+        self.compositor.render(self.frame)
         self.reader.step(self.app.receive)
         self.frame.send()
         self.updater.step()
 
+    def poll(self):
+        self.reader.step(self.app.receive)
+        # The RTC may only count whole seconds, so watch for the deadline's
+        # next tick here rather than relying on get_wake_time() alone.
+        if self.deadline and int(cctime.get_time()) != self.second:
+            self.app.wake()
+
+    def get_wake_time(self):
+        lifeline = self.lifeline
+        if lifeline and lifeline.type == 'newsfeed':
+            return 0  # the ticker scrolls on every frame
+        now = cctime.monotonic()
+        wake_time = self.updater.get_wake_time()
+        if self.next_advance:
+            wake_time = min(wake_time, self.next_advance)
+        if self.deadline:
+            wake_time = min(wake_time, now + 1 - cctime.get_time() % 1)
+        if lifeline and lifeline.type == 'value':
+            interval = ccui.get_value_interval(lifeline)
+            if interval:
+                wake_time = min(wake_time, now + interval)
+        return wake_time
+
+    def clear(self):
+        """Clears the frame and chooses the layers to show on it."""
+        self.frame.clear()
+        layers = [self.loading_layer]
+        if self.deadline:
+            layers = [self.deadline_layer]
+        if self.lifeline and self.lifeline.type in self.lifeline_layers:
+            layers.append(self.lifeline_layers[self.lifeline.type])
+        self.compositor.reset(layers)
+
     def receive(self, command, arg=None):
+        if command == 'NEXT_LANGUAGE':
+            # App has already cleared the frame.
+            self.compositor.reset()
         if command == 'TOGGLE_CAPS':
             self.force_caps = not self.force_caps
-            self.frame.clear()
+            self.clear()
         if command == 'NEXT_LIFELINE':
             self.lifeline = self.lifelines.next()
-            self.frame.clear()
+            self.clear()
@@ -0,0 +1,53 @@
+"""Lookup tables for gamma correction and brightness, shared by all Frames.
+
+Each table is a 256-byte bytes object mapping a component value (0 to 255)
+to a new value, so it can be applied to one component with table[v] or to
+a whole buffer of pixels at once with buffer.translate(table).
+"""
+
+LEVELS = 32  # brightness is quantized to this many levels
+MAX_CACHED_TABLES = 4
+
+SCREEN_GAMMA = 0.3
+
+screen_table = None
+brightness_tables = {}
+
+
+def get_screen_table():
+    """Returns a table that approximates, on a computer screen, how colours
+    look on the LEDs: only the top 4 bits of each component are used, and
+    dim values appear brighter.  It is built on first use, so that the
+    device, which never needs it, doesn't spend memory on it."""
+    global screen_table
+    if not screen_table:
+        screen_table = bytes([
+            int(((float(v & 0xf0)/255.0) ** SCREEN_GAMMA) * 255.99)
+            for v in range(256)
+        ])
+    return screen_table
+
+
+def get_level(brightness):
+    """Quantizes a brightness from 0.0 to 1.0 to a level from 1 to LEVELS."""
+    return max(1, min(LEVELS, int(brightness * LEVELS + 0.5)))
+
+
+def get_brightness_table(brightness, min_value=0, gamma=1):
+    """Returns a table that scales component values by the given brightness
+    (after quantizing it and raising it to the power gamma), but doesn't
+    scale any nonzero values below min_value.  Returns None if the table
+    would leave all values unchanged.  Tables are built once per level and
+    cached, so moving the brightness dial back and forth costs nothing."""
+    level = get_level(brightness)
+    if level == LEVELS:
+        return None
+    key = (level, min_value, gamma)
+    if key not in brightness_tables:
+        if len(brightness_tables) >= MAX_CACHED_TABLES:
+            brightness_tables.clear()
+        scale = (level / LEVELS) ** gamma
+        brightness_tables[key] = bytes([0] + [
+            max(min_value, int(scale * v)) for v in range(1, 256)
+        ])
+    return brightness_tables[key]
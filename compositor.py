@@ -0,0 +1,137 @@
+"""A retained-mode compositor that redraws only the layers that change.
+
+A mode describes its display as a list of Layers, from bottom to top, and
+calls Compositor.render() before each send().  Each layer remembers the
+rectangle it covered when it was last drawn.  When a layer changes, its
+old rectangle is cleared and it is drawn again, along with any other
+layers that overlap the cleared area or the new drawing; all other layers
+are left as they are.  Layers draw with the ordinary Frame methods, so a
+Compositor works with any kind of Frame.
+"""
+
+
+def overlaps(a, b):
+    """Returns True if two rectangles (x, y, w, h) intersect."""
+    if a and b:
+        ax, ay, aw, ah = a
+        bx, by, bw, bh = b
+        return ax < bx + bw and bx < ax + aw and ay < by + bh and by < ay + ah
+    return False
+
+
+class Layer:
+    """One thing drawn by a Compositor.  Subclasses implement draw().
+
+    A layer that can update its previous drawing in place (for example, by
+    repainting only the digits that have changed) should set incremental to
+    True; the Compositor then doesn't clear it before drawing it again."""
+
+    incremental = False
+
+    def __init__(self):
+        self.box = None  # rectangle covered when last drawn, if any
+        self.dirty = True
+
+    def invalidate(self):
+        """Marks the layer to be drawn again on the next render()."""
+        self.dirty = True
+
+    def reset(self):
+        """Called when the previous drawing of the layer has been cleared or
+        drawn over, so the next draw() must draw all of it."""
+        self.dirty = True
+
+    def is_dirty(self):
+        """Returns True if the layer needs to be drawn.  Layers whose content
+        changes over time can override this to check for changes."""
+        return self.dirty
+
+    def draw(self, frame):
+        """Draws the layer and returns the rectangle (x, y, w, h) that it
+        covers, or None if it turned out that nothing needed drawing."""
+        raise NotImplementedError
+
+
+class TextLayer(Layer):
+    """A line of text, drawn with draw_text() whenever the layer is drawn.
+    If static is True, the text is pasted from a label that the frame may
+    keep for reuse; use this for text that is drawn again and again, such
+    as menu items."""
+
+    def __init__(self, x, y, text, font_id, cv, static=False):
+        super().__init__()
+        self.x = x
+        self.y = y
+        self.text = text
+        self.font_id = font_id
+        self.cv = cv
+        self.static = static
+
+    def set_text(self, text):
+        if text != self.text:
+            self.text = text
+            self.invalidate()
+
+    def move(self, x, y):
+        if (x, y) != (self.x, self.y):
+            self.x = x
+            self.y = y
+            self.invalidate()
+
+    def draw(self, frame):
+        if self.static:
+            label = frame.new_label(self.text, self.font_id)
+            frame.paste(self.x, self.y, label, cv=self.cv)
+            w = label.w
+        else:
+            w = frame.draw_text(
+                self.x, self.y, self.text, self.font_id, self.cv)
+        font = frame.fontlib.get(self.font_id)
+        return self.x, self.y, w, font.ascent + font.descent
+
+
+class Compositor:
+    def __init__(self, layers=()):
+        self.reset(layers)
+
+    def reset(self, layers=None):
+        """Marks all layers to be drawn in full on the next render(), and
+        optionally replaces them.  Call this after the frame is cleared."""
+        if layers is not None:
+            self.layers = list(layers)
+        for layer in self.layers:
+            layer.box = None
+            layer.reset()
+
+    def render(self, frame):
+        """Draws the layers that have changed, and those they overlap."""
+        layers = self.layers
+        dirty = [layer.is_dirty() for layer in layers]
+
+        # Clear the changed layers, and redraw what was underneath them.
+        cleared = []
+        for i, layer in enumerate(layers):
+            if dirty[i] and layer.box and not layer.incremental:
+                frame.clear(*layer.box)
+                cleared.append(layer.box)
+                layer.box = None
+        for i, layer in enumerate(layers):
+            if not dirty[i]:
+                for box in cleared:
+                    if overlaps(layer.box, box):
+                        layer.reset()
+                        dirty[i] = True
+                        break
+
+        # Draw from the bottom up; a layer that is drawn over a layer
+        # above it causes that layer to be drawn again as well.
+        for i, layer in enumerate(layers):
+            if dirty[i]:
+                box = layer.draw(frame)
+                layer.dirty = False
+                if box:
+                    layer.box = box if box[2] > 0 and box[3] > 0 else None
+                    for j in range(i + 1, len(layers)):
+                        if not dirty[j] and overlaps(layers[j].box, box):
+                            layers[j].reset()
+                            dirty[j] = True
@@ -3,24 +3,158 @@ import utils
 utils.mem('fontlib1')
 from adafruit_bitmap_font import pcf
 utils.mem('fontlib2')
+import ccfont
+utils.mem('fontlib2a')
 import displayio
 utils.mem('fontlib3')
 
+# Number of decoded glyphs to keep for each CCF font.  This is enough for
+# the characters of a typical clock definition; glyphs for other characters
+# (e.g. from newsfeed headlines in other scripts) are loaded as needed and
+# evicted when they have not been used for a while.
+MAX_GLYPHS = 128
+
 
 class FontLibrary:
-    def __init__(self, fs, dirs):
+    def __init__(self, fs, dirs, max_glyphs=MAX_GLYPHS):
         self.fs = fs
         self.dirs = dirs
+        self.max_glyphs = max_glyphs
         self.fonts = {}
+        self.metrics = {}  # maps font_id to {char: (dx, width, shift_x)}
+        self.runs = {}
 
     def get(self, font_id):
+        """Returns the font with the given ID, loading it on first use.  In
+        each directory, a CCF file is preferred over a PCF file, as it
+        opens without parsing any tables."""
         if font_id not in self.fonts:
             for dir in self.dirs:
-                path = dir + '/' + font_id + '.pcf'
-                if self.fs.isfile(path):
-                    f = self.fs.open(path)
+                path = dir + '/' + font_id
+                if self.fs.isfile(path + '.ccf'):
+                    f = self.fs.open(path + '.ccf')
+                    self.fonts[font_id] = ccfont.Font(
+                        f, displayio.Bitmap, self.max_glyphs, self.forget_glyph)
+                    break
+                if self.fs.isfile(path + '.pcf'):
+                    f = self.fs.open(path + '.pcf')
                     self.fonts[font_id] = pcf.PCF(f, displayio.Bitmap)
                     break
             else:
                 raise ValueError(font_id + ' not found')
         return self.fonts[font_id]
+
+    def preload(self, charsets):
+        """Loads the glyphs for a batch of characters ahead of time, so that
+        they are not read from the file in the middle of drawing a frame.
+        charsets maps each font ID to a string of the characters to load.
+        A CCF font's glyph limit is raised if needed to hold all of them, as
+        otherwise loading the last ones would evict the first."""
+        for font_id, chars in charsets.items():
+            font = self.get(font_id)
+            if isinstance(font, ccfont.Font) and self.max_glyphs is not None:
+                font.max_glyphs = max(self.max_glyphs, len(chars))
+                if len(chars) > self.max_glyphs:
+                    print(f'Preloading {len(chars)} glyphs of {font_id}, ' +
+                          f'more than the limit of {self.max_glyphs}; ' +
+                          f'raising the limit to {len(chars)}.')
+            font.load_glyphs(chars)
+
+    def forget_glyph(self, glyph):
+        """Called when a glyph is evicted from a font."""
+        self.runs.pop(id(glyph), None)
+
+    def layout(self, text, font_id):
+        """Lays out a line of text exactly as bitmap_label.Label would.
+        Returns the width and height of the resulting label, and a list of
+        (glyph, x, y) tuples giving the position of the top-left corner of
+        each glyph's bitmap relative to the top-left corner of the label."""
+        font = self.get(font_id)
+        if not text:
+            return 0, 0, []
+        ascent = font.ascent
+        pen = right = 0
+        left = None
+        placements = []
+        for char in text:
+            glyph = font.get_glyph(ord(char))
+            if glyph:
+                if pen == 0:
+                    left = glyph.dx if left is None else min(left, glyph.dx)
+                placements.append(
+                    (glyph, pen + glyph.dx, ascent - glyph.height - glyph.dy))
+                right = max(right, pen + glyph.dx + glyph.width)
+                pen += glyph.shift_x
+                right = max(right, pen)
+        left = left or 0
+        placements = [(glyph, x - left, y) for glyph, x, y in placements]
+        return right - left, ascent + font.descent, placements
+
+    def measure(self, text, font_id):
+        """Returns the width of the label for a line of text, the same as
+        the width returned by layout(), without laying out the glyphs.  The
+        metrics needed for each character are cached."""
+        metrics = self.metrics.get(font_id)
+        if metrics is None:
+            metrics = self.metrics[font_id] = {}
+        pen = right = 0
+        left = None
+        for char in text:
+            char_metrics = metrics.get(char)
+            if char_metrics is None:
+                glyph = self.get(font_id).get_glyph(ord(char))
+                char_metrics = glyph and (glyph.dx, glyph.width, glyph.shift_x)
+                metrics[char] = char_metrics = char_metrics or ()
+            if char_metrics:
+                dx, width, shift_x = char_metrics
+                if pen == 0:
+                    left = dx if left is None else min(left, dx)
+                right = max(right, pen + dx + width)
+                pen += shift_x
+                right = max(right, pen)
+        return right - (left or 0)
+
+    def get_cells(self, text, font_id):
+        """Returns the x-coordinates of the left edges of the character cells
+        for each character in text, followed by the right edge of the last
+        cell, relative to the left edge of the label for the text.  Each cell
+        spans the advance width of its character."""
+        font = self.get(font_id)
+        pen = 0
+        left = None
+        cells = []
+        for char in text:
+            cells.append(pen)
+            glyph = font.get_glyph(ord(char))
+            if glyph:
+                if pen == 0:
+                    left = glyph.dx if left is None else min(left, glyph.dx)
+                pen += glyph.shift_x
+        cells.append(pen)
+        left = left or 0
+        return [x - left for x in cells]
+
+    def get_runs(self, glyph):
+        """Returns the horizontal runs of nonzero pixels in a glyph's bitmap,
+        as a list of (x, y, w) tuples.  Frames that store pixels in a flat
+        buffer can fill each run with one slice assignment."""
+        key = id(glyph)
+        if key in self.runs:
+            cached_glyph, runs = self.runs[key]
+            if cached_glyph is glyph:
+                return runs
+        bitmap = glyph.bitmap
+        stride = bitmap.width
+        runs = []
+        for y in range(glyph.height):
+            start = None
+            offset = y * stride + glyph.tile_index * glyph.width
+            for x in range(glyph.width + 1):
+                if x < glyph.width and bitmap[offset + x]:
+                    if start is None:
+                        start = x
+                elif start is not None:
+                    runs.append((start, y, x - start))
+                    start = None
+        self.runs[key] = glyph, runs
+        return runs
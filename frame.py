@@ -8,8 +8,25 @@ Implementing send() is optional.  A Frame that cannot send() is useful as a
 buffer that can efficiently paste() from and to Frames of the same subtype.
 The Frame returned by new_label() need not implement any methods; it only
 needs to have self.w and self.h attributes and be accepted by self.paste().
+To draw text that is used only once, draw_text() is cheaper than pasting
+a label, as implementations can draw the glyphs directly into the frame.
+
+Implementations that can send() may keep track of the region that has been
+drawn since the last send() with a DirtyRect, so that send() only needs to
+transfer the changed pixels, or can skip the transfer entirely.
+
+view() returns a SubFrame that draws into a rectangle of its parent frame
+with its own coordinates and clipping, so that a part of the display (such
+as one 16-pixel band) can be drawn as if it were a whole frame.
+
+Between frames, the app calls pause() to wait without drawing anything.
+Implementations that receive input events through the display (such as
+SdlFrame) should keep handling events while paused.
 """
 
+import cctime
+
+
 class Frame:
     def __init__(self):
         raise NotImplementedError('Frame is an abstract interface')
@@ -25,6 +42,10 @@ class Frame:
         necessary to ensure that frames do not queue up indefinitely."""
         raise NotImplementedError
 
+    def pause(self, duration):
+        """Waits for the given number of seconds without sending a frame."""
+        cctime.sleep(duration)
+
     def get(self, x, y):
         """Gets the colour of the single pixel at (x, y).  If the given
         coordinates are out of range, returns black."""
@@ -58,13 +79,29 @@ class Frame:
         this frame are pasted and the rest are ignored."""
         raise NotImplementedError
 
-    def new_label(self, text, font_id):
+    def new_label(self, text, font_id, cache=True):
         """Returns a new Frame, acceptable as a source argument to the paste()
         method, containing the given text rendered with the specified font in
         a default colour.  The resulting frame is sized to the total width of
-        the text and the height of a character cell in the specified font."""
+        the text and the height of a character cell in the specified font.
+        Frames may keep labels to reuse later; pass cache=False for text
+        that is unlikely to be drawn again, such as a changing number."""
         raise NotImplementedError
 
+    def draw_text(self, x, y, text, font_id, cv):
+        """Draws text in the specified font and colour with the top-left
+        corner of its label at (x, y), and returns the width of the label.
+        The result is the same as pasting new_label(text, font_id) with
+        paste(x, y, label, cv=cv), but without creating the label."""
+        label = self.new_label(text, font_id, cache=False)
+        self.paste(x, y, label, cv=cv)
+        return label.w
+
+    def view(self, x, y, w, h):
+        """Returns a Frame for drawing into the w x h rectangle of this frame
+        whose top-left corner is at (x, y), clipped to this frame."""
+        return SubFrame(self, x, y, w, h)
+
 
 def clamp(v, lo, hi):
     return max(lo, min(v, hi))
@@ -76,6 +113,31 @@ def clamp_rect(x, y, w, h, fw, fh):
     yb = clamp(y + h, yt, fh)
     return xl, yt, xr - xl, yb - yt
 
+class DirtyRect:
+    """Accumulates the bounding box of all the rectangles that have been
+    touched since the last reset().  The box is empty when w is zero."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.x = self.y = self.w = self.h = 0
+
+    def add(self, x, y, w, h):
+        """Extends the box to include the given rectangle, which should
+        already be clamped to the bounds of the frame."""
+        if w > 0 and h > 0:
+            if self.w:
+                xr = max(self.x + self.w, x + w)
+                yb = max(self.y + self.h, y + h)
+                self.x = min(self.x, x)
+                self.y = min(self.y, y)
+                self.w = xr - self.x
+                self.h = yb - self.y
+            else:
+                self.x, self.y, self.w, self.h = x, y, w, h
+
+
 def intersect(frame, x, y, source, sx, sy, w, h):
     # Fill in defaults for the source rectangle.
     sl = 0 if sx is None else sx
@@ -102,3 +164,69 @@ def intersect(frame, x, y, source, sx, sy, w, h):
         if sl < sr <= source.w and st < sb <= source.h:
             return x, y, sl, st, sr - sl, sb - st
     return 0, 0, 0, 0, 0, 0
+
+
+class SubFrame(Frame):
+    """A view of a rectangle within a parent frame, as returned by view().
+    Drawing into the view draws directly into the parent's pixels, offset
+    by the position of the view and clipped to its bounds; nothing is
+    copied, and the parent keeps track of what has changed.  A SubFrame can
+    be drawn into, but not used as the source of a paste()."""
+
+    def __init__(self, parent, x, y, w, h):
+        self.parent = parent
+        self.x, self.y, self.w, self.h = clamp_rect(
+            x, y, w, h, parent.w, parent.h)
+        self.fontlib = parent.fontlib
+
+    def view(self, x, y, w, h):
+        x, y, w, h = clamp_rect(x, y, w, h, self.w, self.h)
+        return SubFrame(self.parent, self.x + x, self.y + y, w, h)
+
+    def pack(self, r, g, b):
+        return self.parent.pack(r, g, b)
+
+    def get(self, x, y):
+        if 0 <= x < self.w and 0 <= y < self.h:
+            return self.parent.get(self.x + x, self.y + y)
+        return self.parent.get(-1, -1)
+
+    def set(self, x, y, cv):
+        if 0 <= x < self.w and 0 <= y < self.h:
+            self.parent.set(self.x + x, self.y + y, cv)
+
+    def clear(self, x=0, y=0, w=None, h=None):
+        if w is None:
+            w = self.w
+        if h is None:
+            h = self.h
+        x, y, w, h = clamp_rect(x, y, w, h, self.w, self.h)
+        if w > 0 and h > 0:
+            self.parent.clear(self.x + x, self.y + y, w, h)
+
+    def fill(self, x, y, w, h, cv):
+        x, y, w, h = clamp_rect(x, y, w, h, self.w, self.h)
+        if w > 0 and h > 0:
+            self.parent.fill(self.x + x, self.y + y, w, h, cv)
+
+    def paste(self, x, y, source, sx=None, sy=None, w=None, h=None, cv=None):
+        if source.w == 0 or source.h == 0:
+            return
+        x, y, sx, sy, w, h = intersect(self, x, y, source, sx, sy, w, h)
+        if w > 0 and h > 0:
+            self.parent.paste(
+                self.x + x, self.y + y, source, sx, sy, w, h, cv=cv)
+
+    def new_label(self, text, font_id, cache=True):
+        return self.parent.new_label(text, font_id, cache)
+
+    def draw_text(self, x, y, text, font_id, cv):
+        # The parent clips the text to its own bounds; if that is not the
+        # same as clipping it to the view, paste a label instead.
+        w, h, placements = self.fontlib.layout(text, font_id)
+        px, py = self.x + x, self.y + y
+        xl, yt, cw, ch = clamp_rect(px, py, w, h, self.parent.w, self.parent.h)
+        if (self.x <= xl and xl + cw <= self.x + self.w and
+                self.y <= yt and yt + ch <= self.y + self.h):
+            return self.parent.draw_text(px, py, text, font_id, cv)
+        return Frame.draw_text(self, x, y, text, font_id, cv)
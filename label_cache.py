@@ -0,0 +1,70 @@
+"""A least-recently-used cache for the label frames returned by new_label()."""
+
+
+class LabelCache:
+    """Holds rendered labels keyed by (text, font_id), so that strings drawn
+    repeatedly are rendered only once.  The total size of the cached labels
+    is kept within a budget of max_pixels by evicting the least recently
+    used labels.  A label larger than the whole budget is never cached.
+
+    Labels returned from the cache are shared, so callers must not modify
+    them; they should only be used as a source for paste().  If release is
+    given, release(label) is called for each label that leaves the cache,
+    so that any resources it holds can be reused."""
+
+    def __init__(self, max_pixels, release=None):
+        self.max_pixels = max_pixels
+        self.release = release
+        self.entries = {}  # maps (text, font_id) to [label, last_used]
+        self.pixels = 0  # total size of all cached labels
+        self.clock = 0  # incremented on every lookup, for LRU ordering
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, text, font_id, render, cache=True):
+        """Returns the cached label for the given text and font, or calls
+        render(text, font_id) to create it and caches the result.  If cache
+        is False, a newly rendered label is returned without being cached,
+        so that text drawn only once doesn't push out labels that are still
+        in use."""
+        key = (text, font_id)
+        self.clock += 1
+        entry = self.entries.get(key)
+        if entry:
+            self.hits += 1
+            entry[1] = self.clock
+            return entry[0]
+
+        self.misses += 1
+        label = render(text, font_id)
+        size = label.w * label.h
+        if cache and size <= self.max_pixels:
+            while self.entries and self.pixels + size > self.max_pixels:
+                self.evict()
+            self.entries[key] = [label, self.clock]
+            self.pixels += size
+        return label
+
+    def evict(self):
+        """Removes the least recently used label from the cache."""
+        entries = self.entries
+        key = min(entries, key=lambda key: entries[key][1])
+        label, last_used = entries.pop(key)
+        self.pixels -= label.w * label.h
+        self.evictions += 1
+        if self.release:
+            self.release(label)
+
+    def clear(self):
+        """Removes all labels from the cache."""
+        while self.entries:
+            self.evict()
+
+    def __repr__(self):
+        return (
+            f'LabelCache({len(self.entries)} labels, ' +
+            f'{self.pixels}/{self.max_pixels} px, ' +
+            f'{self.hits} hits, {self.misses} misses, ' +
+            f'{self.evictions} evictions)'
+        )
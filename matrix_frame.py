@@ -9,12 +9,18 @@ import board
 utils.mem('matrix_frame4')
 import cctime
 utils.mem('matrix_frame5')
+import colour
+utils.mem('matrix_frame5a')
 import displayio
 utils.mem('matrix_frame6')
 import frame
 utils.mem('matrix_frame7')
 import framebufferio
 utils.mem('matrix_frame8')
+from label_cache import LabelCache
+utils.mem('matrix_frame8a')
+from slab_pool import SlabPool
+utils.mem('matrix_frame8b')
 import rgbmatrix
 utils.mem('matrix_frame9')
 from ulab import numpy as np
@@ -27,38 +33,53 @@ utils.mem('matrix_frame10')
 BIT_DEPTH = 2
 MIN_RGB_VALUE = 0x100 >> BIT_DEPTH
 
+# Total size of the labels kept by the label cache.  Label bitmaps use 1 bit
+# per pixel, so this is about 3 kB, which is enough to hold all the static
+# strings of the clock face and the menus.
+LABEL_CACHE_PIXELS = 24*1024
+
+# Number of slabs to reserve for rendering cached labels in each font.  The
+# slabs are all allocated when the first label is cached (normally the text
+# beside a value module, soon after startup).  Each slab is as wide as the
+# display, 1 bit per pixel (240 bytes for a 10-pixel-high slab).  Only
+# static text is cached, and it is all in kairon-10.  Labels that don't fit
+# in a slab, or for which no slab is free, get a bitmap of their own.
+SLAB_COUNTS = {'kairon-10': 8}
+
 
 def new_display_frame(w, h, depth, fontlib):
+    """Creates a MatrixFrame for a chain of HUB75 panels that is w pixels
+    wide and h pixels high in total."""
     displayio.release_displays()
+    addr_pins = [
+        board.MTX_ADDRA, board.MTX_ADDRB, board.MTX_ADDRC, board.MTX_ADDRD
+    ]
+    if h > 32:
+        addr_pins.append(board.MTX_ADDRE)  # 64-row panels have 5 address lines
     return MatrixFrame(w, h, depth, fontlib, rgbmatrix.RGBMatrix(
-        width=192, height=32, bit_depth=BIT_DEPTH,
+        width=w, height=h, bit_depth=BIT_DEPTH,
         rgb_pins=[
             board.MTX_R1, board.MTX_G1, board.MTX_B1,
             board.MTX_R2, board.MTX_G2, board.MTX_B2
         ],
-        addr_pins=[
-            board.MTX_ADDRA, board.MTX_ADDRB, board.MTX_ADDRC, board.MTX_ADDRD
-        ],
+        addr_pins=addr_pins,
         clock_pin=board.MTX_CLK,
         latch_pin=board.MTX_LAT,
         output_enable_pin=board.MTX_OE
     ))
 
 
-def apply_brightness(brightness, r, g, b):
-    # When scaling down, don't scale down any nonzero values to zero.
-    min_r = MIN_RGB_VALUE if r else 0
-    min_g = MIN_RGB_VALUE if g else 0
-    min_b = MIN_RGB_VALUE if b else 0
-    return (
-        max(min_r, int(brightness * r)),
-        max(min_g, int(brightness * g)),
-        max(min_b, int(brightness * b))
-    )
+def get_shader_colour(table, r, g, b):
+    # The table never scales nonzero values down below MIN_RGB_VALUE, so
+    # that dim colours don't disappear.
+    if table:
+        r, g, b = table[r], table[g], table[b]
+    return (r << 16) | (g << 8) | b
 
 
 class MatrixFrame(frame.Frame):
-    def __init__(self, w, h, depth, fontlib=None, matrix=None):
+    def __init__(self, w, h, depth, fontlib=None, matrix=None,
+                 label_cache_pixels=LABEL_CACHE_PIXELS, slab_counts=SLAB_COUNTS):
         """Creates a Frame with a given width and height.  Coordinates of the
         top-left and bottom-right pixels are (0, 0) and (w - 1, h - 1)."""
         self.w = w
@@ -67,13 +88,18 @@ class MatrixFrame(frame.Frame):
         self.bitmap = displayio.Bitmap(w, h, depth)
         self.display = None
         self.fontlib = fontlib
+        self.label_cache = LabelCache(label_cache_pixels, self.release_label)
+        self.slab_counts = slab_counts
+        self.slab_pool = None  # allocated when the first label is cached
+        self.dirty = frame.DirtyRect()
+        self.full_refresh = True
         if matrix:
             self.display = framebufferio.FramebufferDisplay(
                 matrix, auto_refresh=False)
 
             self.shader = displayio.Palette(depth)
             self.colours = [(0, 0, 0)] * self.depth
-            self.brightness = 1.0
+            self.brightness_table = None  # None means full brightness
             self.next_cv = 1
 
             self.layer = displayio.TileGrid(self.bitmap, pixel_shader=self.shader)
@@ -83,52 +109,149 @@ class MatrixFrame(frame.Frame):
             self.error_label = None
 
     def set_brightness(self, brightness):
-        self.brightness = brightness
-        for cv in range(self.next_cv):
-            sr, sg, sb = apply_brightness(self.brightness, *self.colours[cv])
-            self.shader[cv] = ((sr << 16) | (sg << 8) | sb)
+        table = colour.get_brightness_table(brightness, MIN_RGB_VALUE)
+        if table is not self.brightness_table:
+            self.brightness_table = table
+            for cv in range(self.next_cv):
+                self.shader[cv] = get_shader_colour(table, *self.colours[cv])
+            self.full_refresh = True
 
     def pack(self, r, g, b):
+        # Reuse an entry if the colour already has one, as the palette is
+        # small and the same colours are packed again whenever the clock
+        # definition is reloaded.
+        for cv in range(self.next_cv):
+            if self.colours[cv] == (r, g, b):
+                return cv
         if self.next_cv < self.depth:
             self.colours[self.next_cv] = (r, g, b)
-            sr, sg, sb = apply_brightness(self.brightness, r, g, b)
-            self.shader[self.next_cv] = ((sr << 16) | (sg << 8) | sb)
+            self.shader[self.next_cv] = get_shader_colour(
+                self.brightness_table, r, g, b)
             self.next_cv += 1
         return self.next_cv - 1
 
+    def clear(self, x=0, y=0, w=None, h=None):
+        # Entry 0 is always black; pack(0, 0, 0) would search the palette.
+        if w is None:
+            w = self.w
+        if h is None:
+            h = self.h
+        self.fill(x, y, w, h, 0)
+
     def send(self):
-        self.display.refresh(minimum_frames_per_second=0)
-        # Display bug: refresh() doesn't cause a refresh unless we also set
-        # auto_refresh = False (even though auto_refresh is already False!).
-        self.display.auto_refresh = False
+        # displayio already limits each refresh to the area of the bitmap that
+        # has changed, so all we can save is the refresh itself.
+        if self.full_refresh or self.dirty.w:
+            self.display.refresh(minimum_frames_per_second=0)
+            # Display bug: refresh() doesn't cause a refresh unless we also set
+            # auto_refresh = False (even though auto_refresh is already False!).
+            self.display.auto_refresh = False
+            self.full_refresh = False
+            self.dirty.reset()
 
     def get(self, x, y):
         return self.bitmap[x, y]
 
     def set(self, x, y, cv):
         self.bitmap[x, y] = cv
+        self.dirty.add(x, y, 1, 1)
 
     def fill(self, x, y, w, h, cv):
         x, y, w, h = frame.clamp_rect(x, y, w, h, self.w, self.h)
         bitmaptools.fill_region(self.bitmap, x, y, x + w, y + h, cv)
+        self.dirty.add(x, y, w, h)
 
     def paste(self, x, y, source, sx=None, sy=None, w=None, h=None, cv=None):
         if source.w == 0 or source.h == 0:
             return
         x, y, sx, sy, w, h = frame.intersect(self, x, y, source, sx, sy, w, h)
+        self.dirty.add(x, y, w, h)
         self.bitmap.blit(
             x, y, source.bitmap, x1=sx, y1=sy, x2=sx+w, y2=sy+h, write_value=cv)
 
-    def new_label(self, text, font_id):
-        font = self.fontlib.get(font_id)
+    def new_label(self, text, font_id, cache=True):
         if not self.error_label:
+            font = self.fontlib.get(font_id)
             self.error_label = LabelFrame('[MemoryError] ', font)
         try:
-            return LabelFrame(text, font)
+            # A label that isn't cached would never give its slab back.
+            render = self.render_label if cache else self.render_own_label
+            return self.label_cache.get(text, font_id, render, cache)
         except MemoryError as e:
             utils.report_error(e, f'Failed to draw "{text}"')
+            print(self.slab_pool)
+            # Free up some memory for the next attempt.
+            self.label_cache.clear()
             return self.error_label
 
+    def get_slab_pool(self):
+        """Returns the slab pool, allocating all the slabs on first use."""
+        if not self.slab_pool:
+            counts = {}
+            for font_id, count in self.slab_counts.items():
+                font = self.fontlib.get(font_id)
+                counts[font.ascent + font.descent] = count
+            self.slab_pool = SlabPool(self.w, counts, displayio.Bitmap)
+            utils.mem('MatrixFrame slabs')
+        return self.slab_pool
+
+    def render_label(self, text, font_id):
+        w, h, placements = self.fontlib.layout(text, font_id)
+        if not self.get_slab_pool().fits(w, h):
+            return self.render_own_label(text, font_id)
+        slab = self.slab_pool.rent(w, h)
+        while not slab and self.label_cache.entries:
+            # Evicting the least recently used labels returns their slabs.
+            self.label_cache.evict()
+            slab = self.slab_pool.rent(w, h)
+        if not slab:
+            return self.render_own_label(text, font_id)
+        bitmaptools.fill_region(slab, 0, 0, w, h, 0)
+        blit_glyphs(slab, 0, 0, 0, 0, w, h, placements, 1)
+        return SlabLabelFrame(slab, w, h)
+
+    def render_own_label(self, text, font_id):
+        """Renders a label into a bitmap of its own, not a slab."""
+        return LabelFrame(text, self.fontlib.get(font_id))
+
+    def release_label(self, label):
+        """Called when a label leaves the label cache."""
+        if isinstance(label, SlabLabelFrame):
+            self.slab_pool.give_back(label.bitmap)
+
+    def draw_text(self, x, y, text, font_id, cv):
+        w, h, placements = self.fontlib.layout(text, font_id)
+        self.fill(x, y, w, h, 0)
+        xl, yt, cw, ch = frame.clamp_rect(x, y, w, h, self.w, self.h)
+        blit_glyphs(self.bitmap, x, y, xl, yt, xl + cw, yt + ch, placements, cv)
+        return w
+
+
+def blit_glyphs(bitmap, x, y, xl, yt, xr, yb, placements, cv):
+    """Draws glyphs laid out by FontLibrary.layout() into a bitmap in colour
+    cv, with the top-left of the layout at (x, y), clipping each glyph to
+    the rectangle from (xl, yt) to (xr - 1, yb - 1)."""
+    for glyph, gx, gy in placements:
+        gl = x + gx
+        gt = y + gy
+        sl = max(0, xl - gl)
+        st = max(0, yt - gt)
+        sr = min(glyph.width, xr - gl)
+        sb = min(glyph.height, yb - gt)
+        if sl < sr and st < sb:
+            sx = glyph.tile_index * glyph.width
+            bitmap.blit(
+                gl + sl, gt + st, glyph.bitmap,
+                x1=sx + sl, y1=st, x2=sx + sr, y2=sb, write_value=cv)
+
+
+class SlabLabelFrame(frame.Frame):
+    def __init__(self, slab, w, h):
+        """A label rendered into the top-left w x h pixels of a slab."""
+        self.bitmap = slab
+        self.w = w
+        self.h = h
+
 
 class LabelFrame(frame.Frame):
     def __init__(self, text, font):
@@ -0,0 +1,191 @@
+"""A Frame that renders into memory only, with no display attached.
+
+MemoryFrame has the same pixel format and colour values as SdlFrame (which
+is built on it), but send() never blocks and shows nothing; it just ends
+the frame.  This makes it suitable for measuring the speed of the render
+loop and for rendering images on machines without a display.  The contents
+can be saved with write_ppm(), write_png(), or write_raw().
+"""
+
+import colour
+import frame
+from label_cache import LabelCache
+import struct
+import zlib
+from adafruit_display_text import bitmap_label
+
+# Total size of the labels kept by the label cache (3 bytes per pixel).
+LABEL_CACHE_PIXELS = 64*1024
+
+
+class MemoryFrame(frame.Frame):
+    # Colours from pack() have been through the screen gamma curve, so the
+    # brightness has to be as well.
+    BRIGHTNESS_GAMMA = colour.SCREEN_GAMMA
+
+    def __init__(self, w, h, pad=0, fontlib=None,
+                 label_cache_pixels=LABEL_CACHE_PIXELS):
+        """Creates a Frame with a given width and height, surrounded by a
+        grey border of pad pixels on each side that is never drawn on.
+        Coordinates of the top-left and bottom-right pixels are (0, 0) and
+        (w - 1, h - 1)."""
+        self.w = w
+        self.h = h
+        self.pad = pad
+        self.fontlib = fontlib
+        self.label_cache = LabelCache(label_cache_pixels)
+
+        self.pw = w + pad*2  # width with padding
+        self.ph = h + pad*2  # height with padding
+        self.pixels = self.new_pixels()
+        self.dirty = frame.DirtyRect()
+        self.full_refresh = True  # set when the whole frame must be sent
+        self.frame_count = 0  # number of calls to send()
+        self.brightness_table = None  # None means full brightness
+
+    def new_pixels(self):
+        """Allocates the pixel buffer, black inside a grey border."""
+        border = b'\x60\x60\x60' * self.pad
+        row = border + b'\x00\x00\x00' * self.w + border
+        return bytearray(border * self.pw + row * self.h + border * self.pw)
+
+    def set_brightness(self, brightness):
+        """Sets the brightness table to be applied by send(); the pixels
+        themselves are unchanged."""
+        table = colour.get_brightness_table(
+            brightness, gamma=self.BRIGHTNESS_GAMMA)
+        if table is not self.brightness_table:
+            self.brightness_table = table
+            self.full_refresh = True
+
+    def pack(self, r, g, b):
+        table = colour.get_screen_table()
+        return bytes([table[r], table[g], table[b]])
+
+    def send(self):
+        """Ends the frame without waiting or displaying anything."""
+        self.frame_count += 1
+        self.full_refresh = False
+        self.dirty.reset()
+
+    def get_offset(self, x, y):
+        return ((x + self.pad) + (y + self.pad) * self.pw) * 3
+
+    def get(self, x, y):
+        offset = self.get_offset(x, y)
+        return self.pixels[offset:offset + 3]
+
+    def set(self, x, y, cv):
+        if 0 <= x < self.w and 0 <= y < self.h:
+            offset = self.get_offset(x, y)
+            self.pixels[offset:offset + 3] = cv
+            self.dirty.add(x, y, 1, 1)
+
+    def fill(self, x, y, w, h, cv):
+        x, y, w, h = frame.clamp_rect(x, y, w, h, self.w, self.h)
+        if w > 0 and h > 0:
+            self.dirty.add(x, y, w, h)
+            row = cv * w
+            for y in range(y, y + h):
+                start = self.get_offset(x, y)
+                self.pixels[start:start + w * 3] = row
+
+    def paste(self, x, y, source, sx=None, sy=None, w=None, h=None, cv=None):
+        if source.w == 0 or source.h == 0:
+            return
+        x, y, sx, sy, w, h = frame.intersect(self, x, y, source, sx, sy, w, h)
+        self.dirty.add(x, y, w, h)
+        for dy in range(h):
+            i = self.get_offset(x, y + dy)
+            si = (sx + (sy + dy) * source.w) * 3
+            if cv is None:
+                self.pixels[i:i + w * 3] = source.pixels[si:si + w * 3]
+            else:
+                for dx in range(w):
+                    is_zero = source.pixels[si:si + 3] == b'\x00\x00\x00'
+                    self.pixels[i:i + 3] = b'\x00\x00\x00' if is_zero else cv
+                    i += 3
+                    si += 3
+
+    def new_label(self, text, font_id, cache=True):
+        return self.label_cache.get(text, font_id, self.render_label, cache)
+
+    def render_label(self, text, font_id):
+        return LabelFrame(text, self.fontlib.get(font_id))
+
+    def draw_text(self, x, y, text, font_id, cv):
+        w, h, placements = self.fontlib.layout(text, font_id)
+        self.fill(x, y, w, h, b'\x00\x00\x00')
+        xl, yt, cw, ch = frame.clamp_rect(x, y, w, h, self.w, self.h)
+        xr, yb = xl + cw, yt + ch
+        for glyph, gx, gy in placements:
+            for rx, ry, rw in self.fontlib.get_runs(glyph):
+                py = y + gy + ry
+                if yt <= py < yb:
+                    pl = max(xl, x + gx + rx)
+                    pr = min(xr, x + gx + rx + rw)
+                    if pl < pr:
+                        i = self.get_offset(pl, py)
+                        self.pixels[i:i + (pr - pl) * 3] = cv * (pr - pl)
+        return w
+
+    def get_raw(self, padded=False):
+        """Returns the pixels as bytes in RGB order, row by row, without the
+        padding unless padded is True."""
+        pixels = bytes(self.pixels)
+        if padded or not self.pad:
+            return pixels
+        return b''.join(
+            pixels[self.get_offset(0, y):self.get_offset(self.w, y)]
+            for y in range(self.h)
+        )
+
+    def write_raw(self, path, padded=False):
+        """Writes the pixels to a file as raw RGB bytes."""
+        with open(path, 'wb') as file:
+            file.write(self.get_raw(padded))
+
+    def write_ppm(self, path, padded=False):
+        """Writes the pixels to a file in binary PPM (P6) format."""
+        w, h = (self.pw, self.ph) if padded else (self.w, self.h)
+        with open(path, 'wb') as file:
+            file.write(b'P6\n%d %d\n255\n' % (w, h))
+            file.write(self.get_raw(padded))
+
+    def write_png(self, path, padded=False, scale=1):
+        """Writes the pixels to a file in PNG format, optionally enlarged
+        by an integer scale factor."""
+        w, h = (self.pw, self.ph) if padded else (self.w, self.h)
+        raw = self.get_raw(padded)
+        rows = []
+        for y in range(h):
+            row = raw[y * w * 3:(y + 1) * w * 3]
+            if scale > 1:
+                row = b''.join(
+                    row[i:i + 3] * scale for i in range(0, len(row), 3))
+            rows.extend([b'\x00' + row] * scale)
+        with open(path, 'wb') as file:
+            file.write(b'\x89PNG\r\n\x1a\n')
+            write_png_chunk(file, b'IHDR', struct.pack(
+                '>IIBBBBB', w * scale, h * scale, 8, 2, 0, 0, 0))
+            write_png_chunk(file, b'IDAT', zlib.compress(b''.join(rows)))
+            write_png_chunk(file, b'IEND', b'')
+
+
+def write_png_chunk(file, kind, data):
+    file.write(struct.pack('>I', len(data)) + kind + data)
+    file.write(struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+
+
+class LabelFrame(frame.Frame):
+    def __init__(self, text, font):
+        label = bitmap_label.Label(font, text=text)
+        palette = b'\x00\x00\x00', b'\xff\xff\xff'
+        if label.bitmap:
+            self.w = label.bitmap.width
+            self.h = label.bitmap.height
+            self.pixels = b''.join(palette[p] for p in label.bitmap)
+        else:
+            # label.bitmap can be None if there is no text to render
+            self.w = self.h = 0
+            self.pixels = b''
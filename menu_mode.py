@@ -1,5 +1,6 @@
 from ccinput import ButtonReader, DialReader, Press
 import cctime
+from compositor import Compositor, TextLayer
 from mode import Mode
 import sys
 
@@ -9,7 +10,18 @@ class MenuMode(Mode):
         super().__init__(app)
         self.cv = self.frame.pack(0x80, 0x80, 0x80)
         self.cursor_cv = self.frame.pack(0x00, 0xff, 0x00)
-        self.cursor_label = self.frame.new_label('>', 'kairon-10')
+        # The menu items don't change while the menu is open, so keep
+        # their labels.
+        self.title_layer = TextLayer(1, 0, '', 'kairon-10', self.cv, True)
+        self.row_layers = [
+            TextLayer(64, y, '', 'kairon-10', self.cv, True)
+            for y in (0, 11, 22)
+        ]
+        self.cursor_layer = TextLayer(
+            58, 0, '', 'kairon-10', self.cursor_cv, True)
+        # The rows are drawn over the title, if it is long enough to reach.
+        self.compositor = Compositor(
+            [self.title_layer] + self.row_layers + [self.cursor_layer])
 
         self.reader = ButtonReader({
             button_map['UP']: {
@@ -30,6 +42,7 @@ class MenuMode(Mode):
         self.reader.reset()
         self.dial_reader.reset()
         self.frame.clear()
+        self.compositor.reset()
         wifi_ssid = self.app.prefs.get('wifi_ssid')
         updater = self.app.clock_mode.updater
         index_updated = updater.index_updated or 'None'
@@ -83,31 +96,33 @@ class MenuMode(Mode):
 
     def draw(self):
         title, value, command, arg, children = self.node
-        self.frame.clear()
         if value and not children:
             title += ': ' + value
-        label = self.frame.new_label(title, 'kairon-10')
-        self.frame.paste(1 - self.offset, 0, label, cv=self.cv)
-        y = 0
-        for index in range(self.top, self.top + 3):
-            if index >= len(children):
-                break
-            child_title, child_value, _, _, _ = children[index]
-            if child_value:
-                child_title += ': ' + child_value
-            label = self.frame.new_label(child_title, 'kairon-10')
-            self.frame.paste(64, y, label, cv=self.cv)
-            if index == self.index:
-                self.frame.paste(58, y, self.cursor_label, cv=self.cursor_cv)
-            y += 11
+        self.title_layer.set_text(title)
+        self.title_layer.move(1 - self.offset, 0)
+        for i, layer in enumerate(self.row_layers):
+            text = ''
+            if self.top + i < len(children):
+                child_title, child_value, _, _, _ = children[self.top + i]
+                text = child_title
+                if child_value:
+                    text += ': ' + child_value
+            layer.set_text(text)
+        self.cursor_layer.set_text(children and '>' or '')
+        self.cursor_layer.move(58, (self.index - self.top) * 11)
+        self.compositor.render(self.frame)
         self.frame.send()
 
     def step(self):
+        self.poll()
+        self.frame.send()  # in case the brightness has changed
+
+    def poll(self):
         self.reader.step(self.app.receive)
         self.dial_reader.step(self.app.receive)
-        # TODO: Currently every mode's step() method must call self.frame.send()
-        # in order for sdl_frame to detect events; fix this leaky abstraction.
-        self.frame.send()
+
+    def get_wake_time(self):
+        return float('inf')  # the display only changes in response to input
 
     def receive(self, command, arg=None):
         if command == 'SELECTOR':
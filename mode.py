@@ -9,6 +9,17 @@ class Mode:
     def step(self):
         pass
 
+    def poll(self):
+        """Checks for input between steps.  Should be cheap, as the app
+        calls it repeatedly while waiting for the next step."""
+        pass
+
+    def get_wake_time(self):
+        """Returns the monotonic time at which step() next needs to run,
+        i.e. when something on the display is next due to change.  Input
+        received in poll() makes step() run sooner."""
+        return 0
+
     def receive(self, command, arg=None):
         pass
 
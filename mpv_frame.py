@@ -1,18 +1,27 @@
 import cctime
-import frame
+from collections import deque
+from memory_frame import LABEL_CACHE_PIXELS, MemoryFrame
 import subprocess
+import threading
 import time
 
-class MpvFrame(frame.Frame):
-    """A Frame implementation that uses the mpv video player for display."""
+# Number of frames that can wait to be written to mpv.  When mpv falls
+# behind and the queue is full, the oldest waiting frame is dropped.
+QUEUE_SIZE = 2
 
-    def __init__(self, w, h, fps):
+class MpvFrame(MemoryFrame):
+    """A Frame implementation that uses the mpv video player for display.
+    Frames are written to mpv by a background thread, so send() never
+    blocks on the pipe."""
+
+    BRIGHTNESS_GAMMA = 1  # pack() doesn't apply a gamma curve
+
+    def __init__(self, w, h, fps, fontlib=None,
+                 label_cache_pixels=LABEL_CACHE_PIXELS, queue_size=QUEUE_SIZE):
         """Creates a Frame with a given width and height.  Coordinates of the
         top-left and bottom-right pixels are (0, 0) and (w - 1, h - 1)."""
-        self.w = w
-        self.h = h
+        MemoryFrame.__init__(self, w, h, 0, fontlib, label_cache_pixels)
         self.timer = cctime.FrameTimer(fps)
-        self.pixels = bytearray(b'\x00\x00\x00' * w * h)
         self.process = subprocess.Popen([
             'mpv',
 
@@ -37,38 +46,45 @@ class MpvFrame(frame.Frame):
             '-'
         ], stdin=subprocess.PIPE)
 
+        self.header = b"P6\n%d %d\n255\n" % (w, h)
+        self.queue = deque((), queue_size)
+        self.queue_ready = threading.Condition()
+        self.dropped_count = 0  # frames dropped because mpv fell behind
+        self.writer = threading.Thread(target=self.write_frames, daemon=True)
+        self.writer.start()
+
     def pack(self, r, g, b):
         """For MpvFrame, the pixel data type is a 3-element bytearray."""
         return bytearray([r, g, b])
 
     def send(self):
         """Did you know that you can simply write PPM images to a pipe to
-        mpv and it will display them in real time?  Amazing!"""
+        mpv and it will display them in real time?  Amazing!  mpv keeps
+        showing the last image, so nothing is queued if nothing has changed."""
         self.timer.wait()
-        self.process.stdin.write(b"P6\n%d %d\n255\n" % (self.w, self.h))
-        if len(self.pixels) != 18432:
-            print(len(self.pixels))
-        self.process.stdin.write(self.pixels)
-        self.process.stdin.flush()
-
-    def get(self, x, y):
-        offset = (x + y * self.w) * 3
-        return self.pixels[offset:offset + 3]
-
-    def set(self, x, y, cv):
-        offset = (x + y * self.w) * 3
-        self.pixels[offset:offset + 3] = cv
-
-    def fill(self, x, y, w, h, cv):
-        x, y, w, h = frame.clamp_rect(x, y, w, h, self.w, self.h)
-        if w > 0 and h > 0:
-            row = cv * w
-            for y in range(y, y + h):
-                start = (x + y * self.w) * 3
-                self.pixels[start:start + w * 3] = row
-
-    def paste(self, x, y, source, sx, sy, sw, sh):
-        raise NotImplemented
+        if self.full_refresh or self.dirty.w:
+            image = bytes(self.pixels)
+            if self.brightness_table:
+                image = image.translate(self.brightness_table)
+            image = self.header + image
+            with self.queue_ready:
+                if len(self.queue) == self.queue.maxlen:
+                    self.dropped_count += 1
+                self.queue.append(image)  # drops the oldest if full
+                self.queue_ready.notify()
+            self.frame_count += 1
+            self.full_refresh = False
+            self.dirty.reset()
 
-    def print(self, font, text, horiz=-1, vert=-1):
-        raise NotImplemented
+    def write_frames(self):
+        """Runs in the writer thread, writing queued images to mpv."""
+        while True:
+            with self.queue_ready:
+                while not self.queue:
+                    self.queue_ready.wait()
+                image = self.queue.popleft()
+            try:
+                self.process.stdin.write(image)
+                self.process.stdin.flush()
+            except OSError:  # mpv has exited
+                return
@@ -0,0 +1,103 @@
+"""A Frame for standard Python that keeps its pixels in a NumPy array.
+
+Pixels are stored in an array of shape (h, w, 3) with dtype uint8, so that
+fill() and paste() (including colourizing with cv=) run as vectorized slice
+and mask operations instead of Python loops.  Otherwise it behaves just
+like MemoryFrame; colour values are the same 3-byte bytes objects.
+
+with_numpy() makes a variant of SdlFrame or MpvFrame that uses this
+storage; for example, with_numpy(SdlFrame)(192, 32, 30, fontlib=fontlib).
+"""
+
+import frame
+from memory_frame import MemoryFrame
+import numpy as np
+
+
+class NumpyFrame(MemoryFrame):
+    def new_pixels(self):
+        """Allocates the pixel array, and sets self.area to a view of the
+        part of it that lies inside the padding."""
+        pixels = np.full((self.ph, self.pw, 3), 0x60, np.uint8)
+        self.area = pixels[self.pad:self.pad + self.h, self.pad:self.pad + self.w]
+        self.area[:] = 0
+        return pixels
+
+    def get(self, x, y):
+        if 0 <= x < self.w and 0 <= y < self.h:
+            return bytes(self.area[y, x])
+        return b'\x00\x00\x00'
+
+    def set(self, x, y, cv):
+        if 0 <= x < self.w and 0 <= y < self.h:
+            self.area[y, x] = np.frombuffer(cv, np.uint8)
+            self.dirty.add(x, y, 1, 1)
+
+    def fill(self, x, y, w, h, cv):
+        x, y, w, h = frame.clamp_rect(x, y, w, h, self.w, self.h)
+        if w > 0 and h > 0:
+            self.dirty.add(x, y, w, h)
+            self.area[y:y + h, x:x + w] = np.frombuffer(cv, np.uint8)
+
+    def paste(self, x, y, source, sx=None, sy=None, w=None, h=None, cv=None):
+        if source.w == 0 or source.h == 0:
+            return
+        x, y, sx, sy, w, h = frame.intersect(self, x, y, source, sx, sy, w, h)
+        if w > 0 and h > 0:
+            self.dirty.add(x, y, w, h)
+            target = self.area[y:y + h, x:x + w]
+            if cv is None:
+                target[:] = source.area[sy:sy + h, sx:sx + w]
+            else:
+                mask = source.area[sy:sy + h, sx:sx + w].any(axis=2)
+                target[:] = 0
+                target[mask] = np.frombuffer(cv, np.uint8)
+
+    def new_label(self, text, font_id, cache=True):
+        return self.label_cache.get(text, font_id, self.render_label, cache)
+
+    def render_label(self, text, font_id):
+        w, h, placements = self.fontlib.layout(text, font_id)
+        label = LabelFrame(w, h)
+        for glyph, gx, gy in placements:
+            for rx, ry, rw in self.fontlib.get_runs(glyph):
+                if 0 <= gy + ry < h:
+                    label.area[gy + ry, max(0, gx + rx):gx + rx + rw] = 0xff
+        return label
+
+    def draw_text(self, x, y, text, font_id, cv):
+        w, h, placements = self.fontlib.layout(text, font_id)
+        self.fill(x, y, w, h, b'\x00\x00\x00')
+        xl, yt, cw, ch = frame.clamp_rect(x, y, w, h, self.w, self.h)
+        xr, yb = xl + cw, yt + ch
+        colour = np.frombuffer(cv, np.uint8)
+        for glyph, gx, gy in placements:
+            for rx, ry, rw in self.fontlib.get_runs(glyph):
+                py = y + gy + ry
+                if yt <= py < yb:
+                    pl = max(xl, x + gx + rx)
+                    pr = min(xr, x + gx + rx + rw)
+                    if pl < pr:
+                        self.area[py, pl:pr] = colour
+        return w
+
+
+class LabelFrame(frame.Frame):
+    def __init__(self, w, h):
+        """Creates a blank label, white on black, to be drawn on."""
+        self.w = w
+        self.h = h
+        self.area = np.zeros((h, w, 3), np.uint8)
+
+
+def with_numpy(frame_class):
+    """Returns a subclass of a Frame class that stores pixels in a flat
+    buffer (such as SdlFrame or MpvFrame), whose drawing operations are
+    provided by NumpyFrame.  The subclass keeps the constructor, pack(),
+    and send() of the original class."""
+    class NumpyBackedFrame(NumpyFrame, frame_class):
+        __init__ = frame_class.__init__
+        pack = frame_class.pack
+        send = frame_class.send
+    NumpyBackedFrame.__name__ = 'Numpy' + frame_class.__name__
+    return NumpyBackedFrame
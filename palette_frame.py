@@ -0,0 +1,187 @@
+"""A Frame that stores one palette index per pixel, like MatrixFrame.
+
+Each pixel is one byte holding an index into a palette of depth colours,
+and pack() allocates palette entries in exactly the same way as
+MatrixFrame.pack() does on the device: entry 0 is black, a colour that
+already has an entry gets the same one again, each new colour takes the
+next free entry, and once all entries are taken, pack() keeps returning
+the last one.  This makes it possible to see the effects of palette
+exhaustion on the desktop.  Pixels are expanded to RGB with lookup tables
+(bytes.translate) only in send(), so drawing costs one byte per pixel
+instead of three.
+
+with_palette() makes a variant of SdlFrame or MpvFrame that uses this
+storage; for example, with_palette(SdlFrame)(192, 32, 30, depth=16).
+"""
+
+import frame
+from memory_frame import MemoryFrame
+
+DEPTH = 16  # number of palette entries, as on the MatrixPortal
+
+
+class PaletteFrame(MemoryFrame):
+    def __init__(self, w, h, depth=DEPTH, **kwargs):
+        """Creates a Frame with a given width and height and a palette of
+        depth colours (at most 256).  Other arguments are as for
+        MemoryFrame."""
+        self.depth = depth
+        MemoryFrame.__init__(self, w, h, **kwargs)
+
+    def new_pixels(self):
+        """Allocates the palette indices and the palette, and returns the
+        RGB buffer that send() expands the indices into."""
+        self.indices = bytearray(self.w * self.h)
+        self.colours = [(0, 0, 0)] * self.depth
+        self.next_cv = 1
+        # Lookup tables from palette index to red, green, and blue values.
+        self.tables = [bytearray(256), bytearray(256), bytearray(256)]
+        return MemoryFrame.new_pixels(self)
+
+    def to_rgb(self, r, g, b):
+        """Converts a colour to the 3 bytes that are stored for it in the
+        RGB buffer.  with_palette() replaces this with the pack() method
+        of the original class."""
+        return MemoryFrame.pack(self, r, g, b)
+
+    def pack(self, r, g, b):
+        for cv in range(self.next_cv):
+            if self.colours[cv] == (r, g, b):
+                return cv
+        if self.next_cv < self.depth:
+            self.colours[self.next_cv] = (r, g, b)
+            self.set_entry(self.next_cv, r, g, b)
+            self.next_cv += 1
+        return self.next_cv - 1
+
+    def clear(self, x=0, y=0, w=None, h=None):
+        # Entry 0 is always black; pack(0, 0, 0) would search the palette.
+        if w is None:
+            w = self.w
+        if h is None:
+            h = self.h
+        self.fill(x, y, w, h, 0)
+
+    def set_entry(self, cv, r, g, b):
+        """Sets the RGB values that palette entry cv expands to."""
+        rgb = self.to_rgb(r, g, b)
+        self.tables[0][cv] = rgb[0]
+        self.tables[1][cv] = rgb[1]
+        self.tables[2][cv] = rgb[2]
+
+    def expand(self, y, h):
+        """Expands rows y to y + h - 1 of palette indices into RGB pixels."""
+        rt, gt, bt = self.tables
+        for y in range(y, y + h):
+            row = self.indices[y * self.w:(y + 1) * self.w]
+            start = self.get_offset(0, y)
+            end = start + self.w * 3
+            self.pixels[start:end:3] = row.translate(rt)
+            self.pixels[start + 1:end:3] = row.translate(gt)
+            self.pixels[start + 2:end:3] = row.translate(bt)
+
+    def expand_changes(self):
+        """Expands all the rows that have been drawn since the last send(),
+        or all rows if the whole frame needs to be sent."""
+        if self.full_refresh:
+            self.expand(0, self.h)
+        elif self.dirty.w:
+            self.expand(self.dirty.y, self.dirty.h)
+
+    def send(self):
+        self.expand_changes()
+        MemoryFrame.send(self)
+
+    def get(self, x, y):
+        if 0 <= x < self.w and 0 <= y < self.h:
+            return self.indices[x + y * self.w]
+        return 0
+
+    def set(self, x, y, cv):
+        if 0 <= x < self.w and 0 <= y < self.h:
+            self.indices[x + y * self.w] = cv
+            self.dirty.add(x, y, 1, 1)
+
+    def fill(self, x, y, w, h, cv):
+        x, y, w, h = frame.clamp_rect(x, y, w, h, self.w, self.h)
+        if w > 0 and h > 0:
+            self.dirty.add(x, y, w, h)
+            row = bytes([cv]) * w
+            for y in range(y, y + h):
+                start = x + y * self.w
+                self.indices[start:start + w] = row
+
+    def paste(self, x, y, source, sx=None, sy=None, w=None, h=None, cv=None):
+        if source.w == 0 or source.h == 0:
+            return
+        x, y, sx, sy, w, h = frame.intersect(self, x, y, source, sx, sy, w, h)
+        self.dirty.add(x, y, w, h)
+        # As with bitmap.blit(write_value=cv) in MatrixFrame, zero pixels
+        # in the source stay zero and all other pixels are set to cv.
+        table = None if cv is None else b'\x00' + bytes([cv]) * 255
+        for dy in range(h):
+            i = x + (y + dy) * self.w
+            si = sx + (sy + dy) * source.w
+            row = source.indices[si:si + w]
+            self.indices[i:i + w] = row if cv is None else row.translate(table)
+
+    def render_label(self, text, font_id):
+        w, h, placements = self.fontlib.layout(text, font_id)
+        label = LabelFrame(w, h)
+        for glyph, gx, gy in placements:
+            for rx, ry, rw in self.fontlib.get_runs(glyph):
+                if 0 <= gy + ry < h:
+                    start = max(0, gx + rx) + (gy + ry) * w
+                    end = min(w, gx + rx + rw) + (gy + ry) * w
+                    label.indices[start:end] = b'\x01' * (end - start)
+        return label
+
+    def draw_text(self, x, y, text, font_id, cv):
+        w, h, placements = self.fontlib.layout(text, font_id)
+        self.fill(x, y, w, h, 0)
+        xl, yt, cw, ch = frame.clamp_rect(x, y, w, h, self.w, self.h)
+        xr, yb = xl + cw, yt + ch
+        value = bytes([cv])
+        for glyph, gx, gy in placements:
+            for rx, ry, rw in self.fontlib.get_runs(glyph):
+                py = y + gy + ry
+                if yt <= py < yb:
+                    pl = max(xl, x + gx + rx)
+                    pr = min(xr, x + gx + rx + rw)
+                    if pl < pr:
+                        i = pl + py * self.w
+                        self.indices[i:i + pr - pl] = value * (pr - pl)
+        return w
+
+    def get_raw(self, padded=False):
+        self.expand(0, self.h)
+        return MemoryFrame.get_raw(self, padded)
+
+
+class LabelFrame(frame.Frame):
+    def __init__(self, w, h):
+        """Creates a blank label to be drawn on, with one byte per pixel
+        that is 1 where there is ink and 0 elsewhere."""
+        self.w = w
+        self.h = h
+        self.indices = bytearray(w * h)
+
+
+def with_palette(frame_class):
+    """Returns a subclass of a Frame class that stores RGB pixels in a flat
+    buffer (such as SdlFrame or MpvFrame), which stores palette indices
+    instead and expands them to RGB just before each send().  The subclass
+    keeps the constructor and send() of the original class, and takes an
+    additional depth argument for the number of palette entries."""
+    class PaletteBackedFrame(PaletteFrame, frame_class):
+        def __init__(self, *args, depth=DEPTH, **kwargs):
+            self.depth = depth
+            frame_class.__init__(self, *args, **kwargs)
+
+        def send(self):
+            self.expand_changes()
+            frame_class.send(self)
+
+        to_rgb = frame_class.pack
+    PaletteBackedFrame.__name__ = 'Palette' + frame_class.__name__
+    return PaletteBackedFrame
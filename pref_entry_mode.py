@@ -64,46 +64,47 @@ class PrefEntryMode(Mode):
         self.dial_reader.reset()
         self.frame.clear()
 
-        label = self.frame.new_label(self.pref_title, FONT)
-        self.frame.paste(1, 0, label, cv=self.cv)
+        self.frame.draw_text(1, 0, self.pref_title, FONT, self.cv)
         self.text = self.app.prefs.get(self.pref_name)
         self.draw()
 
     def step(self):
+        self.poll()
+        self.frame.send()  # in case the brightness has changed
+
+    def poll(self):
         self.reader.step(self.app.receive)
         self.dial_reader.step(self.app.receive)
-        # TODO: Currently every mode's step() method must call self.frame.send()
-        # in order for sdl_frame to detect events; fix this leaky abstraction.
-        self.frame.send()
+
+    def get_wake_time(self):
+        return float('inf')  # the display only changes in response to input
 
     def draw(self):
         self.frame.clear()
-        label = self.frame.new_label(self.pref_title + ': ', FONT)
-        self.frame.paste(0, 0, label, cv=self.cv)
-        text_label = self.frame.new_label(self.text, FONT)
-        self.frame.paste(label.w, 0, text_label, cv=self.cursor_cv)
-        self.frame.fill(label.w + text_label.w, 9, 5, 1, cv=self.cursor_cv)
+        title_w = self.frame.draw_text(
+            0, 0, self.pref_title + ': ', FONT, self.cv)
+        text_w = self.frame.draw_text(
+            title_w, 0, self.text, FONT, self.cursor_cv)
+        self.frame.fill(title_w + text_w, 9, 5, 1, cv=self.cursor_cv)
         x = 5
         for i, option in enumerate(self.menu):
             title, command, chars = option
-            label = self.frame.new_label(title, FONT)
             if i == self.menu_index:
                 if self.menu_selected:
-                    self.frame.paste(x, 10, label, cv=self.cursor_cv)
-
-                    chars_label = self.frame.new_label(chars, FONT)
-                    self.frame.paste(5, 21, chars_label, cv=self.cv)
+                    w = self.frame.draw_text(x, 10, title, FONT, self.cursor_cv)
+                    self.frame.draw_text(5, 21, chars, FONT, self.cv)
 
                     ci = self.char_indexes[self.menu_index]
-                    left = self.frame.new_label(chars[:ci], FONT).w
-                    w = self.frame.new_label(chars[ci], FONT).w
-                    self.frame.fill(5 + left, 31, w - 1, 1, cv=self.cursor_cv)
+                    left = self.frame.fontlib.measure(chars[:ci], FONT)
+                    char_w = self.frame.fontlib.measure(chars[ci], FONT)
+                    self.frame.fill(
+                        5 + left, 31, char_w - 1, 1, cv=self.cursor_cv)
                 else:
-                    self.frame.paste(x, 10, label, cv=self.cv)
-                    self.frame.fill(x, 20, label.w - 1, 1, cv=self.cursor_cv)
+                    w = self.frame.draw_text(x, 10, title, FONT, self.cv)
+                    self.frame.fill(x, 20, w - 1, 1, cv=self.cursor_cv)
             else:
-                self.frame.paste(x, 10, label, cv=self.cv)
-            x += label.w + 4
+                w = self.frame.draw_text(x, 10, title, FONT, self.cv)
+            x += w + 4
         self.frame.send()
 
     def receive(self, command, arg=None):
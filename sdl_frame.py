@@ -1,9 +1,8 @@
 import cctime
-from ctypes import byref, c_char, c_void_p
-import frame
+from ctypes import addressof, byref, c_char, c_void_p
+from memory_frame import LABEL_CACHE_PIXELS, MemoryFrame
 from sdl2 import *
 import time
-from adafruit_display_text import bitmap_label
 
 
 class SdlButton:
@@ -40,23 +39,17 @@ class SdlDial:
         pass
 
 
-class SdlFrame(frame.Frame):
-    def __init__(self, w, h, fps, title='Frame', scale=8, pad=4, fontlib=None):
+class SdlFrame(MemoryFrame):
+    def __init__(self, w, h, fps, title='Frame', scale=8, pad=4, fontlib=None,
+                 label_cache_pixels=LABEL_CACHE_PIXELS):
         """Creates a Frame with a given width and height.  Coordinates of the
         top-left and bottom-right pixels are (0, 0) and (w - 1, h - 1)."""
-        self.w = w
-        self.h = h
+        MemoryFrame.__init__(self, w, h, pad, fontlib, label_cache_pixels)
         self.timer = cctime.FrameTimer(fps)
         self.scale = scale
-        self.pad = pad
-        self.fontlib = fontlib
-
-        self.pw = w + pad*2  # width with padding
-        self.ph = h + pad*2  # height with padding
-        self.pixels = bytearray(b'\x60\x60\x60' * self.pw * self.ph)
-        self.pixels_cptr = (c_char * len(self.pixels)).from_buffer(self.pixels)
+        self.pixels_size = memoryview(self.pixels).nbytes
+        self.pixels_cptr = (c_char * self.pixels_size).from_buffer(self.pixels)
         self.key_handlers = []
-        self.clear()
 
         SDL_Init(SDL_INIT_VIDEO)
         self.window = SDL_CreateWindow(
@@ -70,29 +63,62 @@ class SdlFrame(frame.Frame):
         self.pressed_scancodes = set()
         self.flush_events()
 
-    def set_brightness(self, brightness):
-        print('brightness =', brightness)
-        # TODO: Actually change the brightness of the displayed pixels
-
-    def pack(self, r, g, b):
-        r = int(((float(r & 0xf0)/255.0) ** 0.3) * 255.99)
-        g = int(((float(g & 0xf0)/255.0) ** 0.3) * 255.99)
-        b = int(((float(b & 0xf0)/255.0) ** 0.3) * 255.99)
-        return bytes([r, g, b])
-
     def set_scale(self, scale):
         self.scale = scale
         SDL_SetWindowSize(self.window, self.pw * scale, self.ph * scale)
+        self.full_refresh = True
 
     def send(self):
-        SDL_memcpy(c_void_p(self.canvas.contents.pixels),
-            self.pixels_cptr, len(self.pixels))
+        """Copies and blits only the rows and columns that have been drawn
+        since the last send(); if nothing has been drawn, the window is left
+        as it is and only the frame timing and event handling take place."""
         surface = SDL_GetWindowSurface(self.window)
-        SDL_BlitScaled(self.canvas, None, surface, None)
+        rect = None
+        if self.full_refresh:
+            SDL_memcpy(c_void_p(self.canvas.contents.pixels),
+                self.get_source(0, self.pixels_size), self.pixels_size)
+            SDL_BlitScaled(self.canvas, None, surface, None)
+        elif self.dirty.w:
+            d = self.dirty
+            start = (d.y + self.pad) * self.pw * 3
+            size = d.h * self.pw * 3
+            SDL_memcpy(c_void_p(self.canvas.contents.pixels + start),
+                self.get_source(start, size), size)
+
+            # Scale the changed rectangle to the window's current size.
+            sw, sh = surface.contents.w, surface.contents.h
+            xl, yt = d.x + self.pad, d.y + self.pad
+            xr, yb = xl + d.w, yt + d.h
+            dl, dt = xl * sw // self.pw, yt * sh // self.ph
+            dr, db = xr * sw // self.pw, yb * sh // self.ph
+            rect = SDL_Rect(dl, dt, dr - dl, db - dt)
+            SDL_BlitScaled(self.canvas, byref(SDL_Rect(xl, yt, d.w, d.h)),
+                surface, byref(rect))
         self.timer.wait()
-        SDL_UpdateWindowSurface(self.window)
+        if self.full_refresh:
+            SDL_UpdateWindowSurface(self.window)
+        elif rect:
+            SDL_UpdateWindowSurfaceRects(self.window, byref(rect), 1)
+        self.full_refresh = False
+        self.dirty.reset()
         self.flush_events()
 
+    def pause(self, duration):
+        """Waits without sending a frame, handling events that arrive.  If
+        an event requires the window to be repainted, it is sent again."""
+        cctime.sleep(duration)
+        self.flush_events()
+        if self.full_refresh:
+            self.send()
+
+    def get_source(self, start, size):
+        """Returns a pointer to size bytes of pixel data at offset start,
+        with the brightness table applied."""
+        if self.brightness_table:
+            data = memoryview(self.pixels_cptr).cast('B')[start:start + size]
+            return bytes(data).translate(self.brightness_table)
+        return c_void_p(addressof(self.pixels_cptr) + start)
+
     def flush_events(self):
         event = SDL_Event()
         while SDL_PollEvent(byref(event)):
@@ -106,6 +132,8 @@ class SdlFrame(frame.Frame):
                         self.set_scale(self.scale - 1)
                 elif scancode == SDL_SCANCODE_EQUALS:
                     self.set_scale(self.scale + 1)
+            if event.type == SDL_WINDOWEVENT:
+                self.full_refresh = True
             if event.type == SDL_KEYUP:
                 self.pressed_scancodes -= {scancode}
                 for key_handler in self.key_handlers:
@@ -114,56 +142,3 @@ class SdlFrame(frame.Frame):
                 raise SystemExit()
             if event.type == SDL_QUIT:
                 raise SystemExit()
-
-    def get_offset(self, x, y):
-        return ((x + self.pad) + (y + self.pad) * self.pw) * 3
-
-    def get(self, x, y):
-        offset = self.get_offset(x, y)
-        return self.pixels[offset:offset + 3]
-
-    def set(self, x, y, cv):
-        offset = self.get_offset(x, y)
-        self.pixels[offset:offset + 3] = cv
-
-    def fill(self, x, y, w, h, cv):
-        x, y, w, h = frame.clamp_rect(x, y, w, h, self.w, self.h)
-        if w > 0 and h > 0:
-            row = cv * w
-            for y in range(y, y + h):
-                start = self.get_offset(x, y)
-                self.pixels[start:start + w * 3] = row
-
-    def paste(self, x, y, source, sx=None, sy=None, w=None, h=None, cv=None):
-        if source.w == 0 or source.h == 0:
-            return
-        x, y, sx, sy, w, h = frame.intersect(self, x, y, source, sx, sy, w, h)
-        for dy in range(h):
-            i = self.get_offset(x, y + dy)
-            si = (sx + (sy + dy) * source.w) * 3
-            if cv is None:
-                self.pixels[i:i + w * 3] = source.pixels[si:si + w * 3]
-            else:
-                for dx in range(w):
-                    is_zero = source.pixels[si:si + 3] == b'\x00\x00\x00'
-                    self.pixels[i:i + 3] = b'\x00\x00\x00' if is_zero else cv
-                    i += 3
-                    si += 3
-
-    def new_label(self, text, font_id):
-        font = self.fontlib.get(font_id)
-        return LabelFrame(text, font)
-
-
-class LabelFrame(frame.Frame):
-    def __init__(self, text, font):
-        label = bitmap_label.Label(font, text=text)
-        palette = b'\x00\x00\x00', b'\xff\xff\xff'
-        if label.bitmap:
-            self.w = label.bitmap.width
-            self.h = label.bitmap.height
-            self.pixels = b''.join(palette[p] for p in label.bitmap)
-        else:
-            # label.bitmap can be None if there is no text to render
-            self.w = self.h = 0
-            self.pixels = b''
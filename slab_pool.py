@@ -0,0 +1,48 @@
+"""A pool of preallocated bitmaps for rendering labels into."""
+
+
+class SlabPool:
+    """Holds a fixed set of 1-bit bitmaps ("slabs"), allocated all at once
+    at startup before the heap becomes fragmented, and lends them out for
+    rendering labels.  All slabs are the same width; there is a separate
+    set of slabs for each height (normally the cell heights of the fonts in
+    use).  A slab is rented with rent() and must be handed back with
+    give_back() when the label that uses it is discarded."""
+
+    def __init__(self, width, counts, new_bitmap):
+        """Allocates the slabs.  counts is a dictionary that maps each slab
+        height to the number of slabs of that height, and new_bitmap(w, h,
+        value_count) should return a new bitmap, e.g. displayio.Bitmap."""
+        self.width = width
+        self.counts = counts
+        self.free = {}
+        for h, count in counts.items():
+            self.free[h] = [new_bitmap(width, h, 2) for i in range(count)]
+
+    def fits(self, w, h):
+        """Returns True if a label of size w x h can be rendered in a slab."""
+        return w <= self.width and h in self.free
+
+    def rent(self, w, h):
+        """Returns a free slab that can hold a label of size w x h, or None
+        if there isn't one.  The contents of the slab are left over from
+        its previous use."""
+        if self.fits(w, h) and self.free[h]:
+            return self.free[h].pop()
+
+    def give_back(self, slab):
+        self.free[slab.height].append(slab)
+
+    def get_usage(self):
+        """Returns a dictionary that maps each slab height to a tuple
+        (number of slabs in use, total number of slabs)."""
+        return dict(
+            (h, (count - len(self.free[h]), count))
+            for h, count in self.counts.items()
+        )
+
+    def __repr__(self):
+        return 'SlabPool(' + ', '.join(
+            f'{self.width}x{h}: {used}/{count} used'
+            for h, (used, count) in sorted(self.get_usage().items())
+        ) + ')'
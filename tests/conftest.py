@@ -0,0 +1,13 @@
+import os
+import sys
+
+# Run the tests against the code at the top of the repository, with the
+# same paths that the tools set up.
+top = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(top)
+sys.path.append(top)
+sys.path.append(os.path.join(top, 'stubs'))
+sys.path.append(os.path.join(top, 'tools'))
+for name in os.listdir(top):
+    if name.startswith('Adafruit_CircuitPython'):
+        sys.path.append(os.path.join(top, name))
@@ -0,0 +1,42 @@
+import cctime
+import ccui
+import headless
+from palette_frame import PaletteFrame
+
+START_TIME = 1656633600  # 2022-07-01 00:00:00 UTC
+FPS = 30
+
+
+def run_clock(tmp_path, lifeline_type, frame_count):
+    ccui.newsfeed_ticker.reset()
+    cctime.set_fake_time(START_TIME)
+    fs = headless.make_fs(str(tmp_path), 'tools/bench_data/clock.json')
+    instance = headless.make_app(fs, frame_class=PaletteFrame)
+    instance.start()
+    clock_mode = instance.clock_mode
+    while clock_mode.lifeline.type != lifeline_type:
+        clock_mode.lifeline = clock_mode.lifelines.next()
+    clock_mode.clear()
+    for i in range(frame_count):
+        instance.step()
+        cctime.set_fake_time(cctime.get_time() + 1/FPS)
+    return instance
+
+
+def check_colours(instance):
+    """Reloads the clock definition many times, as the updater does after
+    fetching a new one, and checks that the clock is not drawn in black."""
+    clock_mode = instance.clock_mode
+    frame = instance.frame
+    for i in range(frame.depth * 2):
+        clock_mode.reload_definition()
+        for cv in [clock_mode.deadline_cv, clock_mode.lifeline_cv]:
+            assert frame.colours[cv] != (0, 0, 0)
+
+
+def test_value_clock_keeps_palette(tmp_path):
+    check_colours(run_clock(tmp_path, 'value', 300))
+
+
+def test_newsfeed_clock_keeps_palette(tmp_path):
+    check_colours(run_clock(tmp_path, 'newsfeed', 300))
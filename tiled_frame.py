@@ -0,0 +1,90 @@
+"""A Frame that spans several smaller frames, for displays made of panels.
+
+A TiledFrame arranges backing frames (tiles) side by side or stacked to
+make one larger canvas; for example, two 192 x 32 frames one above the
+other make a 192 x 64 canvas.  Drawing is passed on only to the tiles that
+it touches, in each tile's own coordinates, and each tile keeps its own
+pixels and dirty rectangle, so send() only transfers the tiles that have
+changed.
+
+All the tiles should be frames of the same type, so that labels and
+colour values from one tile are accepted by the others.  pack() is called
+on every tile, which keeps palette-based tiles such as MatrixFrame
+allocating the same entries in step.
+"""
+
+import frame
+
+
+class TiledFrame(frame.Frame):
+    def __init__(self, tiles):
+        """Creates a Frame from a list of (x, y, tile) triples, giving the
+        position of the top-left corner of each tile on the canvas.  The
+        canvas is just large enough to contain all the tiles."""
+        self.tiles = tiles
+        self.w = max(x + tile.w for x, y, tile in tiles)
+        self.h = max(y + tile.h for x, y, tile in tiles)
+        self.fontlib = tiles[0][2].fontlib
+
+    def get_tiles(self, x, y, w, h):
+        """Returns the tiles that overlap the given rectangle."""
+        return [
+            (tx, ty, tile) for tx, ty, tile in self.tiles
+            if x < tx + tile.w and tx < x + w and y < ty + tile.h and ty < y + h
+        ]
+
+    def set_brightness(self, brightness):
+        for x, y, tile in self.tiles:
+            tile.set_brightness(brightness)
+
+    def pack(self, r, g, b):
+        cvs = [tile.pack(r, g, b) for x, y, tile in self.tiles]
+        return cvs[0]
+
+    def send(self):
+        """Sends each tile that has changed since the last send()."""
+        for x, y, tile in self.tiles:
+            tile.send()
+
+    def pause(self, duration):
+        """Pauses on the first tile; the other tiles pause for no time, so
+        that each of them still gets to handle events."""
+        for i, (x, y, tile) in enumerate(self.tiles):
+            tile.pause(duration if i == 0 else 0)
+
+    def get(self, x, y):
+        for tx, ty, tile in self.get_tiles(x, y, 1, 1):
+            return tile.get(x - tx, y - ty)
+        return self.tiles[0][2].get(-1, -1)
+
+    def set(self, x, y, cv):
+        for tx, ty, tile in self.get_tiles(x, y, 1, 1):
+            tile.set(x - tx, y - ty, cv)
+
+    def clear(self, x=0, y=0, w=None, h=None):
+        if w is None:
+            w = self.w
+        if h is None:
+            h = self.h
+        for tx, ty, tile in self.get_tiles(x, y, w, h):
+            tile.clear(x - tx, y - ty, w, h)
+
+    def fill(self, x, y, w, h, cv):
+        for tx, ty, tile in self.get_tiles(x, y, w, h):
+            tile.fill(x - tx, y - ty, w, h, cv)
+
+    def paste(self, x, y, source, sx=None, sy=None, w=None, h=None, cv=None):
+        if source.w == 0 or source.h == 0:
+            return
+        x, y, sx, sy, w, h = frame.intersect(self, x, y, source, sx, sy, w, h)
+        for tx, ty, tile in self.get_tiles(x, y, w, h):
+            tile.paste(x - tx, y - ty, source, sx, sy, w, h, cv=cv)
+
+    def new_label(self, text, font_id, cache=True):
+        return self.tiles[0][2].new_label(text, font_id, cache)
+
+    def draw_text(self, x, y, text, font_id, cv):
+        w, h, placements = self.fontlib.layout(text, font_id)
+        for tx, ty, tile in self.get_tiles(x, y, w, h):
+            tile.draw_text(x - tx, y - ty, text, font_id, cv)
+        return w
@@ -0,0 +1,48 @@
+"""Sets up the clock app to run without a display or a network.
+
+Shared by tools/bench and tools/render, which run this module from the
+top of the repository with stubs/ and the Adafruit libraries on sys.path.
+make_fs() prepares a file system with the fonts and a clock definition,
+and make_app() runs App on it with a MemoryFrame, stand-in buttons and
+dials, and a network that never comes online.
+"""
+
+W, H = 192, 32
+
+
+class Button:
+    pressed = False
+
+
+class Dial:
+    def __init__(self, value):
+        self.value = value
+
+
+def make_fs(root, definition_path):
+    """Sets up a file system in the directory root with the fonts and the
+    clock definition, and returns it."""
+    from fs import FileSystem
+    fs = FileSystem(root)
+    for path in ['kairon-10.ccf', 'kairon-16.ccf']:
+        fs.write(path, open(path, 'rb').read())
+    fs.write('/cache/clock.json', open(definition_path, 'rb').read())
+    fs.write('/prefs.json', b'{}')
+    return fs
+
+
+def make_app(fs, brightness=0.99, frame_class=None):
+    """Creates an App that draws into a W x H frame of the given class,
+    which takes the same arguments as MemoryFrame (the default)."""
+    import app
+    from fontlib import FontLibrary
+    from memory_frame import MemoryFrame
+    from unix_network import UnixNetwork
+
+    frame_class = frame_class or MemoryFrame
+    frame = frame_class(W, H, fontlib=FontLibrary(fs, ['.']))
+    # The SSID never matches, so the network stays offline.
+    network = UnixNetwork('headless-offline', 'headless-offline')
+    buttons = {'UP': Button(), 'DOWN': Button(), 'ENTER': Button()}
+    dials = {'BRIGHTNESS': Dial(brightness), 'SELECTOR': Dial(0)}
+    return app.App(fs, network, frame, buttons, dials)
@@ -1,7 +1,36 @@
+"""A Network for standard Python, built on non-blocking sockets.
+
+Joining Wi-Fi is simulated: enable_step() goes ONLINE after a short delay
+if the SSID and password match the ones given to the constructor.  The
+connections are real, but no step waits on the network.  The host name is
+looked up in a background thread (getaddrinfo() has no non-blocking form),
+and connecting, the TLS handshake, sending, and receiving each go only as
+far as the socket allows without blocking, using a selector to see when
+the socket is ready.  As with socket.create_connection(), each address
+that the host name resolves to is tried in turn until one connects.  Data
+that the socket won't take yet is kept and sent by later steps.  Errors are
+raised to the caller after the connection has been closed.
+"""
+
+import cctime
 from cctime import get_time
+import errno
 from network import Network, State
+import os
+import selectors
 import socket
 from ssl import create_default_context as create_ssl_context
+from ssl import SSLWantReadError, SSLWantWriteError, SSLZeroReturnError
+import threading
+
+# If a connection isn't ready after this many seconds, give up and retry.
+CONNECT_TIMEOUT = 15
+
+# If connecting to one address takes this many seconds, try the next one.
+ADDRESS_TIMEOUT = 5
+
+# Exceptions that mean a non-blocking operation has to be tried again later.
+WOULD_BLOCK = (BlockingIOError, SSLWantReadError, SSLWantWriteError)
 
 
 class UnixNetwork(Network):
@@ -13,9 +42,24 @@ class UnixNetwork(Network):
         self.initialize_time = None
         self.wifi_connect_delay = wifi_connect_delay
         self.wifi_connect_time = None
+        self.selector = selectors.DefaultSelector()
+        self.ssl_context = None  # created on first use; loading it is slow
         self.socket = None
+        self.reset_connection()
         self.set_state(State.OFFLINE)
 
+    def reset_connection(self):
+        self.connect_started = None
+        self.lookup = None  # filled in by the lookup thread
+        self.addresses = None  # addresses from the lookup not yet tried
+        self.connect_error = None  # why the last address failed
+        self.address = None  # the address being connected to
+        self.address_started = None  # when connecting to it began
+        self.connecting = False  # waiting for the TCP connection
+        self.handshaking = False  # waiting for the TLS handshake
+        self.handshake_events = 0  # events the handshake is waiting for
+        self.outgoing = bytearray()  # data waiting to be sent
+
     def get_firmware_version(self):
         return 'None'
 
@@ -43,33 +87,192 @@ class UnixNetwork(Network):
             elif ssid == self.ssid and password == self.password:
                 self.wifi_connect_time = get_time() + self.wifi_connect_delay
 
+    def resolve(self, hostname, port, lookup):
+        """Looks up a host name, in a background thread.  Appends a list of
+        addresses, or the exception that was raised, to lookup."""
+        try:
+            lookup.append(socket.getaddrinfo(
+                hostname, port, type=socket.SOCK_STREAM))
+        except Exception as e:
+            lookup.append(e)
+
+    def watch(self, events):
+        """Sets the events that the selector watches the socket for."""
+        if self.selector.get_key(self.socket).events != events:
+            self.selector.modify(self.socket, events)
+
+    def is_ready(self, events):
+        """Returns True if any of the given events have happened on the
+        socket, without waiting."""
+        self.watch(events)
+        return bool(self.selector.select(0))
+
     def connect_step(self, hostname, port=None, ssl=True):
         port = port or (443 if ssl else 80)
-        print(f'Connecting to', hostname, 'port', port)
-        sock = socket.create_connection((hostname, port))
-        if ssl:
-            context = create_ssl_context()
-            sock = context.wrap_socket(sock, server_hostname=hostname)
-        self.socket = sock
+        try:
+            if not self.connect_started:
+                print(f'Connecting to', hostname, 'port', port)
+                if ssl and not self.ssl_context:
+                    self.ssl_context = create_ssl_context()
+                self.connect_started = cctime.monotonic()
+                self.lookup = []
+                threading.Thread(
+                    target=self.resolve, args=(hostname, port, self.lookup),
+                    daemon=True
+                ).start()
+
+            elif cctime.monotonic() > self.connect_started + CONNECT_TIMEOUT:
+                print(f'No connection after {CONNECT_TIMEOUT} seconds; retrying.')
+                self.close_step()
+
+            elif not self.socket:
+                if self.lookup:
+                    if isinstance(self.lookup[0], Exception):
+                        raise self.lookup[0]
+                    self.addresses = list(self.lookup[0])
+                    self.connect_next()
+
+            elif self.connecting:
+                if self.is_ready(selectors.EVENT_WRITE):
+                    error = self.socket.getsockopt(
+                        socket.SOL_SOCKET, socket.SO_ERROR)
+                    if error:
+                        self.try_next_address(
+                            OSError(error, os.strerror(error)))
+                    else:
+                        self.connecting = False
+                        if ssl:
+                            self.selector.unregister(self.socket)
+                            self.socket = self.ssl_context.wrap_socket(
+                                self.socket, server_hostname=hostname,
+                                do_handshake_on_connect=False)
+                            self.selector.register(
+                                self.socket, selectors.EVENT_READ)
+                            self.handshaking = True
+                            self.handshake_events = selectors.EVENT_WRITE
+                        self.handshake_step()
+                elif self.addresses and (cctime.monotonic() >
+                        self.address_started + ADDRESS_TIMEOUT):
+                    self.try_next_address(OSError(
+                        errno.ETIMEDOUT, os.strerror(errno.ETIMEDOUT)))
+
+            elif self.handshaking:
+                if self.is_ready(self.handshake_events):
+                    self.handshake_step()
+
+        except:
+            self.close_step()
+            raise
+
+    def connect_next(self):
+        """Starts connecting to the next address from the lookup, skipping
+        any that fail at once, as socket.create_connection() does.  Raises
+        the last error if every address has failed."""
+        while self.addresses:
+            family, type, proto, name, address = self.addresses.pop(0)
+            sock = None
+            try:
+                sock = socket.socket(family, type, proto)
+                sock.setblocking(False)
+                error = sock.connect_ex(address)
+                if error not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+                    raise OSError(error, os.strerror(error))
+            except OSError as e:
+                print(f'Could not connect to {address[0]}: {e}')
+                self.connect_error = e
+                if sock:
+                    sock.close()
+                continue
+            self.socket = sock
+            self.selector.register(sock, selectors.EVENT_WRITE)
+            self.connecting = True
+            self.address = address
+            self.address_started = cctime.monotonic()
+            return
+        raise self.connect_error or OSError('No addresses to connect to')
+
+    def try_next_address(self, error):
+        """Gives up on the address being connected to, and goes on to the
+        next one."""
+        print(f'Could not connect to {self.address[0]}: {error}')
+        self.connect_error = error
+        self.selector.unregister(self.socket)
+        self.socket.close()
+        self.socket = None
+        self.connecting = False
+        self.connect_next()
+
+    def handshake_step(self):
+        """Continues the TLS handshake, if any, and goes to CONNECTED when
+        the connection is ready."""
+        if self.handshaking:
+            try:
+                self.socket.do_handshake()
+            except SSLWantReadError:
+                self.handshake_events = selectors.EVENT_READ
+                return
+            except SSLWantWriteError:
+                self.handshake_events = selectors.EVENT_WRITE
+                return
+            self.handshaking = False
+        self.watch(selectors.EVENT_READ)
+        print('Connected!')
         self.set_state(State.CONNECTED)
 
+    def flush(self):
+        """Sends as much of the waiting data as the socket will take without
+        blocking, and returns True if all of it has been sent."""
+        while self.outgoing:
+            try:
+                sent = self.socket.send(self.outgoing)
+            except WOULD_BLOCK:
+                return False
+            self.outgoing[:sent] = b''
+        return True
+
     def send_step(self, data):
         if self.socket:
-            self.socket.send(data)
+            self.outgoing.extend(data)
+            try:
+                self.flush()
+            except:
+                self.close_step()
+                raise
 
     def receive_step(self, count):
-        if self.socket:
+        """Returns the data that has arrived, up to count bytes, or b'' if
+        there is none yet.  Any data still waiting to be sent goes first."""
+        if not self.socket:
+            return b''
+        try:
+            if not self.flush():
+                return b''
+            pending = getattr(self.socket, 'pending', None)
+            if not (pending and pending()):
+                if not self.is_ready(selectors.EVENT_READ):
+                    return b''
             data = self.socket.recv(count)
-            if len(data) == 0:
-                self.close_step()
-            return data
+        except WOULD_BLOCK:
+            return b''
+        except SSLZeroReturnError:
+            data = b''
+        except:
+            self.close_step()
+            raise
+        if len(data) == 0:
+            self.close_step()
+        return data
 
     def close_step(self):
         if self.socket:
+            self.selector.unregister(self.socket)
             self.socket.close()
             self.socket = None
+        self.reset_connection()
+        if self.state == State.CONNECTED:
             self.set_state(State.ONLINE)
 
     def disable_step(self):
+        self.close_step()
         self.set_state(State.OFFLINE)
         self.initialized = False
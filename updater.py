@@ -42,6 +42,12 @@ class SoftwareUpdater:
         self.next_check = cctime.monotonic() + delay
         self.step = self.wait_step
 
+    def get_wake_time(self):
+        """Returns the monotonic time at which step() next has work to do."""
+        if self.step == self.wait_step:
+            return self.next_check
+        return 0
+
     def wait_step(self):
         if cctime.monotonic() > self.next_check:
             self.api_fetcher = HttpFetcher(
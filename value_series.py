@@ -0,0 +1,50 @@
+"""Evaluates value modules at many times at once, for previews and testing.
+
+evaluate() computes the same scaled integers as ccui.get_scaled_value() for
+a whole array of timestamps using NumPy, and format_values() turns them into
+the strings that the clock would display.  This needs NumPy, so it only runs
+under standard Python, not on the device.
+"""
+
+import ccui
+import numpy as np
+
+# Largest magnitude that is safe for intermediate results in int64.
+INT64_LIMIT = 1 << 62
+
+
+def evaluate(module, times_millis):
+    """Returns an array of the values of a linear value module at each of
+    the given times (in milliseconds since 1970), as integers scaled by
+    module.fixed_scale.  The array is int64 when the values are certain to
+    fit, and of Python ints otherwise, so the results are always exact."""
+    elapsed = np.asarray(times_millis, np.int64) - module.ref_millis
+    # a*e//1000 == a*(e//1000) + a*(e%1000)//1000 for floor division, and
+    # splitting it this way keeps the products small.
+    seconds, millis = np.divmod(elapsed, 1000)
+    initial, rate = module.scaled_initial, module.scaled_rate
+    largest = abs(rate) * (int(abs(seconds).max(initial=0)) + 1000)
+    if abs(initial) + largest >= INT64_LIMIT:
+        seconds, millis = seconds.astype(object), millis.astype(object)
+    return initial + rate * seconds + rate * millis // 1000
+
+
+def format_values(module, times_millis):
+    """Returns a list of the strings that the clock would display for a
+    value module at each of the given times (in milliseconds since 1970)."""
+    if module.growth != 'linear':
+        return [''] * len(times_millis)
+    return [
+        ccui.format_scaled_value(module, int(value))
+        for value in evaluate(module, times_millis)
+    ]
+
+
+def evaluate_all(defn, times_millis):
+    """Evaluates every linear value module in a clock definition at the
+    given times.  Returns a dictionary that maps each module to its array
+    of scaled values."""
+    return dict(
+        (module, evaluate(module, times_millis)) for module in defn.modules
+        if module.type == 'value' and module.growth == 'linear'
+    )